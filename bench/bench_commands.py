@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""Per-command latency and allocation benchmark with regression thresholds
+
+Every command path of the core is timed against each transport backend,
+with the simulator as the device. With the default --scale 0 the simulated
+module answers instantly, so the numbers are pure host-side overhead: frame
+building, transfers, decoding. Allocation is the peak traced heap growth
+during one call (tracemalloc), i.e. transient garbage the call creates.
+
+    python3 bench/bench_commands.py               # compare with baseline.json
+    python3 bench/bench_commands.py --update      # rewrite the baseline
+    python3 bench/bench_commands.py --bus 1       # also time DevI2C on hardware
+
+Exits 1 if any command is slower than baseline * (1 + --time-tolerance) or
+allocates more than baseline + --alloc-tolerance bytes.
+"""
+import argparse
+import ctypes
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from id809 import ID809
+from id809_sim import ID809Sim
+from id809_transport import DevI2C, MachineI2C
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+
+class SimMachineI2C:
+    """machine.I2C-shaped front for the simulator"""
+
+    def __init__(self, sim):
+        self.sim = sim
+
+    def writeto(self, addr, buf):
+        self.sim.write(buf)
+
+    def readfrom_into(self, addr, buf):
+        self.sim.readinto(buf)
+
+
+class SimSMBus:
+    """smbus2.SMBus-shaped front for the simulator (i2c_rdwr only)"""
+
+    def __init__(self, sim):
+        self.sim = sim
+
+    def i2c_rdwr(self, *msgs):
+        for msg in msgs:
+            if msg.flags & 1:
+                buf = bytearray(msg.len)
+                self.sim.readinto(buf)
+                ctypes.memmove(msg.buf, bytes(buf), msg.len)
+            else:
+                self.sim.write(bytes(msg))
+
+    def close(self):
+        pass
+
+
+def backends(scale, bus):
+    """(name, sim or None, transport) for every backend usable here"""
+    sim = ID809Sim(scale=scale)
+    yield 'sim', sim, sim
+
+    sim = ID809Sim(scale=scale)
+    yield 'machine', sim, MachineI2C(SimMachineI2C(sim))
+
+    try:
+        from id809_transport import SMBus2I2C
+        sim = ID809Sim(scale=scale)
+        yield 'smbus2', sim, SMBus2I2C(SimSMBus(sim))
+    except ImportError:
+        print('smbus2   skipped (smbus2 not installed)')
+
+    if bus is not None:
+        yield 'devi2c', None, DevI2C(bus)
+
+
+def prepare(sim, fp, name):
+    """Put the simulated module in the state the command needs"""
+    fp._state = 1
+    fp._number = 1
+    fp._led_state = None  # time the LED frame, not the unchanged-state skip
+    if sim is None:
+        return
+    del sim.commands[:]  # the log would otherwise regrow inside a timed call
+    sim.place('alice')
+    sim.image = 'alice'
+    sim.ram = ['alice', None, None]
+    sim.templates = {1: 'alice'}
+
+
+COMMANDS = [
+    ('is_connected', lambda fp: fp.is_connected()),
+    ('ctrl_led', lambda fp: fp.ctrl_led(1, 4, 0)),
+    ('detect_finger', lambda fp: fp.detect_finger()),
+    ('_get_image', lambda fp: fp._get_image()),
+    ('_generate', lambda fp: fp._generate(0)),
+    ('_merge', lambda fp: fp._merge()),
+    ('store_fingerprint', lambda fp: fp.store_fingerprint(2)),
+    ('search', lambda fp: fp.search()),
+    ('get_empty_id', lambda fp: fp.get_empty_id()),
+]
+
+
+def measure(sim, fp, name, fn, rounds):
+    """Return (median us per call, max transient bytes per call)"""
+    times = []
+    peak = 0
+    for _ in range(rounds):
+        prepare(sim, fp, name)
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        fn(fp)
+        times.append((time.perf_counter() - start) * 1e6)
+        peak = max(peak, tracemalloc.get_traced_memory()[1] - base)
+    times.sort()
+    return times[len(times) // 2], peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--rounds', type=int, default=50)
+    parser.add_argument('--scale', type=float, default=0.0,
+                        help='simulated processing time scale (0 = instant)')
+    parser.add_argument('--bus', type=int, help='Linux I2C bus with a sensor')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--update', action='store_true', help='rewrite the baseline')
+    parser.add_argument('--time-tolerance', type=float, default=1.0)
+    parser.add_argument('--alloc-tolerance', type=int, default=256)
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    results = {}
+    failures = []
+    tracemalloc.start()
+    for backend, sim, transport in backends(args.scale, args.bus):
+        fp = ID809(transport)
+        results[backend] = {}
+        for name, fn in COMMANDS:
+            prepare(sim, fp, name)
+            fn(fp)  # warm up caches (frame cache, buffers, match stats)
+            us, alloc = measure(sim, fp, name, fn, args.rounds)
+            results[backend][name] = {'us': round(us, 1), 'alloc': alloc}
+            status = ''
+            ref = baseline.get(backend, {}).get(name)
+            if ref and not args.update:
+                if us > ref['us'] * (1 + args.time_tolerance):
+                    status = 'SLOWER (baseline %.1f us)' % ref['us']
+                elif alloc > ref['alloc'] + args.alloc_tolerance:
+                    status = 'ALLOCATES MORE (baseline %d B)' % ref['alloc']
+                if status:
+                    failures.append((backend, name))
+            print('%-8s %-18s %9.1f us %7d B  %s' % (backend, name, us, alloc, status))
+    tracemalloc.stop()
+
+    if args.update:
+        baseline.update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print('baseline written to %s' % args.baseline)
+    elif failures:
+        print('%d regression(s)' % len(failures))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
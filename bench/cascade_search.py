@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""cascade_search() against search(), hit and miss, at 80 and 200 slots
+
+Every slot holds a template and eight users are popular. The match counts
+are built by matching them, then each call starts from a generated feature
+in RAM buffer 0, so only the search commands are timed. A hit is the
+user who matched last; a miss is the user in the last slot, which the
+first tier does not cover. The first tier is one search, so a miss costs
+one short scan more than search(). The popular users sit
+either scattered over the slots or packed into the low ones, as
+relayout() leaves them.
+
+    python3 bench/cascade_search.py
+    python3 bench/cascade_search.py --no-poll     # fixed CMD_DELAY waits
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from id809 import ID809
+from id809_sim import ID809Sim
+
+
+def median_ms(fn, rounds):
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+    return times[len(times) // 2]
+
+
+def setup(capacity, popular, poll):
+    """A full simulated library whose popular slots have matched before"""
+    sim = ID809Sim(capacity=capacity)
+    for slot in range(1, capacity + 1):
+        sim.enroll(slot, 'user%d' % slot)
+    fp = ID809(sim, poll=poll)
+    fp.begin()
+    for _ in range(3):
+        for slot in popular:
+            fp._matched(slot)
+    return sim, fp
+
+
+def timed(sim, fp, call, slot, rounds, stats, recent):
+    """(median ms, searches per call) for call finding slot from stats"""
+    def run():
+        fp.match_stats, fp._recent = dict(stats), list(recent)
+        sim.ram[0] = 'user%d' % slot
+        fp._state = 1
+        assert call() == slot
+
+    ms = median_ms(run, rounds)
+    del sim.commands[:]
+    run()
+    return ms, sum(1 for cmd in sim.commands if cmd == 0x0063)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--rounds', type=int, default=10)
+    parser.add_argument('--no-poll', dest='poll', action='store_false')
+    args = parser.parse_args()
+
+    for capacity in (80, 200):
+        step = capacity // 8
+        layouts = (('scattered', [3 + i * step for i in range(8)]),
+                   ('packed', list(range(1, 9))))
+        for layout, popular in layouts:
+            sim, fp = setup(capacity, popular, args.poll)
+            stats, recent = dict(fp.match_stats), list(fp._recent)
+            hot = fp.hot_slots()[0]
+            print('%d slots, popular %s' % (capacity, layout))
+            for case, slot in (('hit', hot), ('miss', capacity)):
+                for name, call in (('search', fp.search),
+                                   ('cascade', fp.cascade_search)):
+                    ms, searches = timed(sim, fp, call, slot, args.rounds,
+                                         stats, recent)
+                    print('  %-4s %-8s %7.1f ms  %d search(es)' %
+                          (case, name, ms, searches))
+
+
+if __name__ == '__main__':
+    main()
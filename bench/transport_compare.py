@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""Compare kernel round trips and latency: legacy smbus2 path vs DevI2C
+
+The legacy path is the one the smbus2 ports used: the frame goes out as
+write_i2c_block_data chunks built from lists with a 1 ms sleep after each,
+then a fixed delay, then a 32-byte read_i2c_block_data. The new path is the
+protocol core on DevI2C: frame write and first readiness probe share one
+I2C_RDWR ioctl. Each probe reads the smallest complete frame, so a ready
+probe has fetched the header, and only the rest of LEN is read after it,
+straight into the receive buffer. A repeated command sleeps until the
+completion time seen before probing again.
+
+Every counted call below is one syscall on a real bus (an ioctl for smbus2,
+write/readv/ioctl for DevI2C), so the counts are kernel round trips.
+
+    python3 bench/transport_compare.py            # simulated device
+    python3 bench/transport_compare.py --bus 1    # sensor on /dev/i2c-1
+"""
+import argparse
+import os
+import struct
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from id809 import ID809
+from id809_transport import DevI2C, FakeTransport
+
+ADDR = 0x1F
+
+# (name, cmd, payload, fixed delay the legacy path slept, in seconds)
+COMMANDS = [
+    ('is_connected', 0x0001, None, 0.05),
+    ('ctrl_led', 0x0024, bytes((1, 4, 4, 0)), 0.05),
+    ('detect_finger', 0x0021, None, 0.24),
+]
+
+
+class Counted:
+    """Proxy counting calls to the named methods of obj"""
+
+    def __init__(self, obj, names):
+        self._obj = obj
+        self.calls = 0
+        for name in names:
+            setattr(self, name, self._wrap(getattr(obj, name)))
+
+    def _wrap(self, fn):
+        def call(*args):
+            self.calls += 1
+            return fn(*args)
+        return call
+
+    def __getattr__(self, name):
+        return getattr(self._obj, name)
+
+
+class TimedDevice(FakeTransport):
+    """Fake sensor that answers a fraction of the nominal delay after a write"""
+
+    def __init__(self, work):
+        FakeTransport.__init__(self, self._reply)
+        self.work = work
+        self._ready = 0
+
+    def _reply(self, frame):
+        cmd = frame[4] << 8 | frame[5]
+        self._ready = time.monotonic() + self.work.get(cmd, 0)
+        data = b'\x01\x00' if cmd == 0x0021 else b''
+        rcm = bytearray(struct.pack('>HBBHHH', 0x55AA, 0, 0, cmd, len(data) + 2, 0))
+        rcm += data
+        rcm += struct.pack('>H', (0xFF + sum(rcm[2:])) & 0xFFFF)
+        return bytes(rcm)
+
+    def readinto(self, buf):
+        if time.monotonic() < self._ready:
+            for i in range(len(buf)):
+                buf[i] = self.BUSY
+            return
+        FakeTransport.readinto(self, buf)
+
+
+class FakeSMBus:
+    """smbus2-shaped front for a fake device (register byte ignored)"""
+
+    def __init__(self, dev):
+        self.dev = dev
+
+    def write_i2c_block_data(self, addr, reg, data):
+        self.dev.write(bytes(data))
+
+    def read_i2c_block_data(self, addr, reg, n):
+        buf = bytearray(n)
+        self.dev.readinto(buf)
+        return list(buf)
+
+
+def legacy(bus, fp, cmd, payload, delay):
+    """The pre-core smbus2 send/receive path"""
+    packet = fp._build(fp.CMD_TYPE, cmd, payload, len(payload or b''), bytearray(26))
+    for i in range(0, len(packet), 32):
+        bus.write_i2c_block_data(ADDR, 0, list(packet[i:i + 32]))
+        time.sleep(0.001)
+    time.sleep(delay)
+    buf = bytearray(bus.read_i2c_block_data(ADDR, 0, 32))
+    return buf[0] != 0xEE
+
+
+def core(fp, cmd, payload, delay):
+    length = len(payload or b'')
+    fp._send_packet(fp._pack(fp.CMD_TYPE, cmd, payload, length))
+    return fp._wait_response(cmd) == fp.ERR_SUCCESS
+
+
+def run(label, fn, counter, rounds):
+    for name, cmd, payload, delay in COMMANDS:
+        counter.calls = 0
+        ok = 0
+        start = time.monotonic()
+        for _ in range(rounds):
+            ok += bool(fn(cmd, payload, delay))
+        ms = (time.monotonic() - start) * 1000 / rounds
+        print('%-8s %-14s %8.1f ms %6.1f syscalls  %d/%d ok'
+              % (label, name, ms, counter.calls / rounds, ok, rounds))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--bus', type=int, help='Linux I2C bus with a sensor')
+    parser.add_argument('--rounds', type=int, default=10)
+    parser.add_argument('--work', type=float, default=0.4,
+                        help='simulated completion time as a fraction of the fixed delay')
+    args = parser.parse_args()
+
+    if args.bus is None:
+        work = dict((cmd, delay * args.work) for _, cmd, _, delay in COMMANDS)
+        smbus = Counted(FakeSMBus(TimedDevice(work)),
+                        ['write_i2c_block_data', 'read_i2c_block_data'])
+        dev = Counted(TimedDevice(work), ['write', 'readinto', 'write_read'])
+    else:
+        from smbus2 import SMBus
+        smbus = Counted(SMBus(args.bus), ['write_i2c_block_data', 'read_i2c_block_data'])
+        dev = Counted(DevI2C(args.bus, ADDR), ['write', 'readinto', 'write_read'])
+
+    fp = ID809(dev, ADDR)
+    run('legacy', lambda *a: legacy(smbus, fp, *a), smbus, args.rounds)
+    run('devi2c', lambda *a: core(fp, *a), dev, args.rounds)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""1:1 verify(slot) against 1:N search() latency, at 80 and 200 slots
+
+Both start from a generated feature in RAM buffer 0, so only the matching
+command itself is timed: frame, module processing, completion polling and
+response. On the simulator, processing time follows its delay model
+(search grows with the number of slots scanned). The matching template is
+in the last slot, the worst case for a scan.
+
+    python3 bench/verify_vs_search.py             # simulated 80 and 200
+    python3 bench/verify_vs_search.py --bus 1     # the sensor on /dev/i2c-1
+
+On hardware, enroll the finger in the last slot first and keep it on the
+window; the capacity comes from the module.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from id809 import ID809
+from id809_sim import ID809Sim
+
+
+def median_ms(fn, rounds):
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+    return times[len(times) // 2]
+
+
+def compare(fp, rounds):
+    """(verify ms, search ms) for the template in the last slot"""
+    last = fp.fingerprint_capacity
+
+    def verify():
+        fp._state = 1
+        assert fp.verify(last) == last
+
+    def search():
+        fp._state = 1
+        assert fp.search() == last
+
+    return median_ms(verify, rounds), median_ms(search, rounds)
+
+
+def report(name, verify_ms, search_ms):
+    print('%-10s verify %7.1f ms   search %7.1f ms   %4.1fx' %
+          (name, verify_ms, search_ms, search_ms / verify_ms))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--bus', type=int, help='Linux I2C bus with a sensor')
+    args = parser.parse_args()
+
+    if args.bus is not None:
+        fp = ID809(args.bus)
+        fp.begin()
+        if fp.collection_fingerprint(10) != fp.ERR_SUCCESS:
+            sys.exit('no finger')
+        report('%d slots' % fp.fingerprint_capacity, *compare(fp, args.rounds))
+        return
+
+    for capacity in (80, 200):
+        sim = ID809Sim(capacity=capacity)
+        sim.enroll(capacity, 'alice')
+        sim.ram[0] = 'alice'
+        fp = ID809(sim)
+        fp.begin()
+        report('%d slots' % capacity, *compare(fp, args.rounds))
+
+
+if __name__ == '__main__':
+    main()
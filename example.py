@@ -8,6 +8,11 @@ i2c = I2C(0, scl=Pin(22), sda=Pin(21))  # Adjust pins as needed
 # Create sensor instance
 fp = ID809(i2c)
 
+# With the sensor's IRQ line wired, block on it instead of polling the bus
+# for presence (a pin left unconnected would float):
+# from id809_irq import PinPresence
+# fp = ID809(i2c, presence=PinPresence(23))  # Adjust IRQ pin as needed
+
 # Initialize
 if not fp.begin():
     print("Failed to initialize sensor!")
@@ -17,7 +22,7 @@ if not fp.begin():
 def enroll_finger():
     """Enroll a new fingerprint"""
     # Set LED to breathing blue
-    fp.ctrl_led(fp.LED_MODES['BREATHING'], fp.LED_COLORS['BLUE'], 0)
+    fp.ctrl_led(fp.LED_MODES['BREATHING'], fp.LED_COLORS['BLUE'], 0, False)
     
     print("Place finger on sensor")
     
@@ -28,48 +33,47 @@ def enroll_finger():
             time.sleep(1)
             
         print(f"Collection {i+1} successful")
-        fp.ctrl_led(fp.LED_MODES['FAST_BLINK'], fp.LED_COLORS['YELLOW'], 3)
+        fp.ctrl_led(fp.LED_MODES['FAST_BLINK'], fp.LED_COLORS['YELLOW'], 3, False)
         
         print("Remove finger")
-        while fp.detect_finger():
-            time.sleep(0.1)
+        fp.wait_finger(False, 10)
             
         time.sleep(1)
         
     # Store fingerprint
-    fp.ctrl_led(fp.LED_MODES['FAST_BLINK'], fp.LED_COLORS['BLUE'], 3)
+    fp.ctrl_led(fp.LED_MODES['FAST_BLINK'], fp.LED_COLORS['BLUE'], 3, False)
     ret = fp.store_fingerprint(1)  # Store as ID 1
     
     if ret == 0:
         print("Enrollment successful!")
-        fp.ctrl_led(fp.LED_MODES['KEEPS_ON'], fp.LED_COLORS['GREEN'], 0)
+        fp.ctrl_led(fp.LED_MODES['KEEPS_ON'], fp.LED_COLORS['GREEN'], 0, False)
     else:
         print("Enrollment failed!")
-        fp.ctrl_led(fp.LED_MODES['KEEPS_ON'], fp.LED_COLORS['RED'], 0)
+        fp.ctrl_led(fp.LED_MODES['KEEPS_ON'], fp.LED_COLORS['RED'], 0, False)
     
     time.sleep(2)
-    fp.ctrl_led(fp.LED_MODES['NORMAL_CLOSE'], fp.LED_COLORS['BLUE'], 0)
+    fp.ctrl_led(fp.LED_MODES['NORMAL_CLOSE'], fp.LED_COLORS['BLUE'], 0, False)
 
 def verify_finger():
     """Verify a fingerprint"""
     print("Place finger to verify")
-    fp.ctrl_led(fp.LED_MODES['BREATHING'], fp.LED_COLORS['BLUE'], 0)
+    fp.ctrl_led(fp.LED_MODES['BREATHING'], fp.LED_COLORS['BLUE'], 0, False)
     
     if fp.collection_fingerprint(10) == 0:
         match_id = fp.search()
         
         if match_id > 0:
             print(f"Match found! ID: {match_id}")
-            fp.ctrl_led(fp.LED_MODES['KEEPS_ON'], fp.LED_COLORS['GREEN'], 0)
+            fp.ctrl_led(fp.LED_MODES['KEEPS_ON'], fp.LED_COLORS['GREEN'], 0, False)
         else:
             print("No match found")
-            fp.ctrl_led(fp.LED_MODES['KEEPS_ON'], fp.LED_COLORS['RED'], 0)
+            fp.ctrl_led(fp.LED_MODES['KEEPS_ON'], fp.LED_COLORS['RED'], 0, False)
     else:
         print("Failed to capture fingerprint")
-        fp.ctrl_led(fp.LED_MODES['KEEPS_ON'], fp.LED_COLORS['RED'], 0)
+        fp.ctrl_led(fp.LED_MODES['KEEPS_ON'], fp.LED_COLORS['RED'], 0, False)
     
     time.sleep(2)
-    fp.ctrl_led(fp.LED_MODES['NORMAL_CLOSE'], fp.LED_COLORS['BLUE'], 0)
+    fp.ctrl_led(fp.LED_MODES['NORMAL_CLOSE'], fp.LED_COLORS['BLUE'], 0, False)
 
 # Main loop
 while True:
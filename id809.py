@@ -1,6 +1,67 @@
-from machine import I2C, Pin
 import time
 import struct
+import id809_transport
+
+try:
+    from time import sleep_ms, ticks_ms, ticks_diff
+except ImportError:  # CPython hosts
+    def sleep_ms(ms):
+        time.sleep(ms / 1000)
+
+    def ticks_ms():
+        return int(time.monotonic() * 1000)
+
+    def ticks_diff(a, b):
+        return a - b
+
+
+class Deadline:
+    """End-to-end budget for an operation that can also be cancelled
+
+    ms is measured on the monotonic tick clock from construction; None
+    means no time limit, only cancel(), which is safe from another thread.
+    Apply one with ID809.within().
+    """
+
+    def __init__(self, ms=None):
+        self.start = ticks_ms()
+        self.ms = ms
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def remaining(self):
+        """ms left, None without a time limit"""
+        if self.ms is None:
+            return None
+        return max(0, self.ms - ticks_diff(ticks_ms(), self.start))
+
+    def stop(self):
+        """Error tag once the operation has to end, else None"""
+        if self.cancelled:
+            return "CANCELLED"
+        if self.ms is not None and ticks_diff(ticks_ms(), self.start) >= self.ms:
+            return "DEADLINE"
+        return None
+
+
+class _Within:
+    """Context manager installing a Deadline on a driver"""
+
+    def __init__(self, fp, deadline):
+        self.fp = fp
+        self.deadline = deadline
+        self.prev = None
+
+    def __enter__(self):
+        self.prev = self.fp.deadline
+        self.fp.deadline = self.deadline
+        return self.deadline
+
+    def __exit__(self, *exc):
+        self.fp.deadline = self.prev
+
 
 class ID809:
     # Command codes
@@ -16,6 +77,52 @@ class ID809:
     # Error codes
     ERR_SUCCESS = 0x00
     ERR_ID809 = 0xFF
+
+    DELALL = 0xFF  # del_fingerprint: every slot
+
+    # Filler byte the module clocks out while a command is still running
+    BUSY = 0xEE
+
+    # Response frame header size (prefix to RET) and largest frame accepted
+    RCM_HEADER = 10
+    RCM_MAX = 64
+
+    # Bytes read per readiness probe: the smallest complete frame (header
+    # and checksum). A ready probe already holds the header, and all of a
+    # frame without data, so it never reads past the end of a frame
+    RCM_PROBE = RCM_HEADER + 2
+
+    # Nominal completion time (ms) per command, used as the fixed delay when
+    # polling is off and as the reference for the polling deadline
+    CMD_DELAY = {
+        0x0001: 50,   # test connection
+        0x0004: 50,   # device info
+        0x0020: 360,  # get image
+        0x0021: 240,  # finger detect
+        0x0024: 50,   # LED control
+        0x0040: 360,  # store
+        0x0041: 100,  # load template from slot to RAM
+        0x0042: 100,  # upload template from RAM
+        0x0043: 100,  # download template to RAM
+        0x0044: 100,  # delete
+        0x0045: 100,  # get empty id
+        0x0049: 100,  # enrolled id list
+        0x0060: 360,  # generate
+        0x0061: 360,  # merge
+        0x0063: 360,  # search
+        0x0064: 150,  # verify: one template, no database scan
+    }
+
+    # Completion polling: first probe delay, backoff cap and deadline factor
+    POLL_MIN_MS = 2
+    POLL_MAX_MS = 32
+    POLL_DEADLINE = 2
+
+    # Presence polling without an IRQ line: fast_ms between detects for
+    # hold_ms after activity, then doubling up to idle_ms; a new state
+    # counts after confirm identical reads in a row
+    PRESENCE_PROFILE = {'fast_ms': 10, 'idle_ms': 250, 'hold_ms': 3000,
+                        'confirm': 2}
     
     # LED modes
     LED_MODES = {
@@ -39,16 +146,77 @@ class ID809:
         'WHITE': 7
     }
 
-    def __init__(self, i2c, address=0x1F):
-        self.i2c = i2c
+    # 200 capacity devices: wire value for LED modes and colors 1-7
+    LED_MODE_200 = (0, 2, 4, 1, 0, 3, 6, 7)
+    LED_COLOR_200 = (0x87, 0x84, 0x82, 0x86, 0x81, 0x85, 0x83, 0x87)
+
+    def __init__(self, i2c=1, address=0x1F, poll=True, presence=None,
+                 presence_profile=None):
+        """i2c is a transport (see id809_transport), a machine.I2C, or a
+        Linux bus number to open with the fastest transport available.
+        presence_profile overrides keys of PRESENCE_PROFILE."""
+        if isinstance(i2c, int):
+            i2c = id809_transport.open_transport(i2c, address)
+        elif hasattr(i2c, 'readfrom_into'):
+            i2c = id809_transport.MachineI2C(i2c, address)
+        self.bus = i2c
         self.addr = address
+        self.poll = poll
+        self.presence = presence  # optional IRQ source, see id809_irq
+        self.presence_profile = dict(self.PRESENCE_PROFILE)
+        if presence_profile:
+            self.presence_profile.update(presence_profile)
+        self._activity = None  # ticks of the last presence reading that moved
+        self.saved_ms = {}  # cmd -> ms saved versus the fixed delay, last call
+        self._done_ms = {}  # cmd -> expected completion, see _completed()
+        self._done_slots = {}  # cmd -> slots scanned when _done_ms was taken
         self.fingerprint_capacity = 80
         self._number = 0
         self._state = 0
         self._error = self.ERR_SUCCESS
+        self._frames = {}            # cmd -> cached payload-less frame
+        self._tx = bytearray(26)     # reusable frame for commands with data
+        self._led_frames = {}        # (capacity, mode, color, blink) -> frame
+        self._led_state = None       # last acknowledged steady LED state
+        self._rx = bytearray(self.RCM_MAX)  # receive buffer, see _response_payload
+        self._rxv = memoryview(self._rx)
+        self._buf = self._rxv[0:0]   # DATA of the last response
+        self._cmd = 0                # command awaiting a response
+        self._probed = False         # rx holds a probe from write_read
+        self._deferred = 0           # cmd whose response is still unread
+        self._deferred_at = 0
+        self._deferred_led = None
+        self.deferred_error = None   # (cmd, error) of the last failed one
+        self.on_deferred_error = None  # callback(cmd, error)
+        self.deadline = None         # Deadline bounding commands, see within()
+        self._slots = None           # bitmap of enrolled slots, see load_slots()
+        self._enrolled = 0           # bits set in _slots
+        self.groups = {}             # name -> [(start, end)], see set_group()
+        self.match_stats = {}        # slot -> matches, see hot_slots()
+        self.hot_size = 8
+        self.hot_searches = 1        # range searches in the cascade's first tier
+        self.hot_span = None         # slots it may scan; None: capacity / 8
+        self.hot_hits = 0
+        self._recent = []            # matched slots, most recent first
+
+    def within(self, deadline):
+        """Bound every command issued inside a with block by deadline
+
+            d = Deadline(1500)
+            with fp.within(d):
+                match, timings = fp.identify()
+
+        The deadline and d.cancel() are checked between bus transactions.
+        A command the module is still working on is abandoned, not waited
+        for: its response is drained before the next command. The failing
+        call returns as on any error, with _error "DEADLINE" or "CANCELLED".
+        """
+        return _Within(self, deadline)
 
     def begin(self):
         """Initialize the sensor"""
+        self._led_state = None
+        self._slots = None
         device_info = self.get_device_info()
         if device_info:
             if device_info[-1] == '4':
@@ -58,56 +226,112 @@ class ID809:
             return True
         return False
     
+    def get_device_info(self):
+        """Read the module's version string, None on failure"""
+        header = self._pack(self.CMD_TYPE, 0x0004, None, 0)
+        self._send_packet(header)
+        ret = self._wait_response(0x0004)
+        if ret == self.ERR_SUCCESS:
+            return bytes(self._buf).decode()
+        return None
+
     def is_connected(self):
         """Test connection with sensor"""
         header = self._pack(self.CMD_TYPE, 0x0001, None, 0)
         self._send_packet(header)
-        time.sleep_ms(50)
-        ret = self._response_payload()
+        ret = self._wait_response(0x0001)
         return ret == self.ERR_SUCCESS
 
-    def ctrl_led(self, mode, color, blink_count):
-        """Control the LED ring"""
-        data = bytearray(4)
-        if self.fingerprint_capacity == 80:
-            data[0] = mode
-            data[1] = data[2] = color
-            data[3] = blink_count
-        else:
-            # Handle 200 capacity device LED mapping
-            mode_map = {1:2, 2:4, 3:1, 4:0, 5:3}
-            data[0] = mode_map.get(mode, mode)
-            color_val = {1:0x84, 2:0x82, 3:0x86, 4:0x81, 5:0x85, 6:0x83, 7:0x87}
-            data[1] = data[2] = color_val.get(color, 0x87)
-            
-        header = self._pack(self.CMD_TYPE, 0x0024, data, 4)
-        self._send_packet(header)
-        time.sleep_ms(50)
-        return self._response_payload()
+    def ctrl_led(self, mode, color, blink_count, wait=True):
+        """Control the LED ring
+
+        A steady state equal to the last acknowledged one is not resent.
+        With wait=False the frame is sent and the call returns at once; the
+        acknowledgement is read before the next command or on flush(), and
+        a failure is reported through deferred_error / on_deferred_error.
+        """
+        state = (mode, color, blink_count)
+        if state == self._led_state:
+            return self.ERR_SUCCESS
+        self._led_state = None
+        self._send_packet(self._led_frame(mode, color, blink_count))
+        if not wait:
+            self._defer(state)
+            return self.ERR_SUCCESS
+        ret = self._wait_response(0x0024)
+        self._led_acked(state, ret)
+        return ret
+
+    def flush(self):
+        """Read the acknowledgement of a command sent with wait=False
+
+        Called automatically before the next command; call it when the bus
+        is otherwise idle to surface a failure sooner. Returns the deferred
+        command's result, ERR_SUCCESS if nothing was pending.
+        """
+        if not self._deferred:
+            return self.ERR_SUCCESS
+        cmd, start = self._deferred, self._deferred_at
+        self._deferred = 0
+        # Draining keeps the protocol in step; no deadline applies to it
+        deadline, self.deadline = self.deadline, None
+        try:
+            ret = self._wait_response(cmd, start)
+        finally:
+            self.deadline = deadline
+        return self._deferred_done(cmd, ret)
 
     def detect_finger(self):
         """Detect if finger is present"""
         header = self._pack(self.CMD_TYPE, 0x0021, None, 0)
         self._send_packet(header)
-        time.sleep_ms(240)
-        ret = self._response_payload()
+        ret = self._wait_response(0x0021)
         if ret == self.ERR_SUCCESS:
             return self._buf[0]
         return 0
 
+    def wait_finger(self, present, timeout):
+        """Wait until a finger is placed (True) or removed (False)
+
+        Without an IRQ source detect_finger() is polled according to
+        presence_profile: quickly right after activity, backing off while
+        nothing happens, and a single stray read never ends the wait.
+        """
+        if self.presence and not self.deadline:
+            return self.presence.wait(present, timeout)
+
+        start = ticks_ms()
+        seen = 0
+        wait = 0
+        while True:
+            if self.presence:
+                # Short slices, so a cancel() is noticed
+                if self.presence.wait(present, 0.05):
+                    return True
+            elif bool(self.detect_finger()) == present:
+                seen += 1
+                self._activity = ticks_ms()
+                if seen >= self.presence_profile['confirm']:
+                    return True
+            else:
+                seen = 0
+            remaining = self._left(timeout * 1000 - ticks_diff(ticks_ms(), start))
+            if remaining <= 0 or self._stop():
+                return False
+            if not self.presence:
+                wait = self._presence_interval(wait)
+                sleep_ms(min(wait, remaining))
+
     def collection_fingerprint(self, timeout):
         """Collect fingerprint image"""
         if self._number > 2:
             self._error = "GATHER_OUT"
             return self.ERR_ID809
             
-        start = time.ticks_ms()
-        while not self.detect_finger():
-            if time.ticks_diff(time.ticks_ms(), start) > timeout * 1000:
-                self._error = "TIMEOUT"
-                self._state = 0
-                return self.ERR_ID809
-            time.sleep_ms(10)
+        if not self.wait_finger(True, timeout):
+            self._error = self._stop() or "TIMEOUT"
+            self._state = 0
+            return self.ERR_ID809
             
         ret = self._get_image()
         if ret != self.ERR_SUCCESS:
@@ -135,73 +359,888 @@ class ID809:
         
         header = self._pack(self.CMD_TYPE, 0x0040, data, 4)
         self._send_packet(header)
-        time.sleep_ms(360)
-        return self._response_payload()
+        ret = self._wait_response(0x0040)
+        if ret == self.ERR_SUCCESS:
+            self._mark(fid, True)
+        return ret
+
+    def del_fingerprint(self, fid):
+        """Delete one slot, or every slot with DELALL"""
+        if fid == self.DELALL:
+            ret = self._delete(1, self.fingerprint_capacity)
+        else:
+            ret = self._delete(fid, fid)
+        if ret == self.ERR_SUCCESS:
+            self._mark(fid, False)
+        return ret
+
+    def upload_template(self, fid):
+        """Read the template in slot fid to the host; bytes, None on failure
+
+        The template passes through RAM buffer 0, replacing any collected
+        fingerprint there.
+        """
+        self._state = 0
+        data = bytearray(4)
+        struct.pack_into('<HH', data, 0, fid, 0)
+        self._send_packet(self._pack(self.CMD_TYPE, 0x0041, data, 4))
+        if self._wait_response(0x0041) != self.ERR_SUCCESS:
+            return None
+        data = bytearray(2)
+        self._send_packet(self._pack(self.CMD_TYPE, 0x0042, data, 2))
+        if self._wait_response(0x0042) != self.ERR_SUCCESS:
+            return None
+        # The template follows as a data packet, larger than a response
+        self._rx_room(self._buf)
+        if self._wait_response(0x0042, data=True) != self.ERR_SUCCESS:
+            return None
+        return bytes(self._buf)
+
+    def download_template(self, fid, template):
+        """Store a template from upload_template() in slot fid"""
+        self._state = 0
+        data = bytearray(2)
+        struct.pack_into('<H', data, 0, len(template) + 2)
+        self._send_packet(self._pack(self.CMD_TYPE, 0x0043, data, 2))
+        ret = self._wait_response(0x0043)
+        if ret == self.ERR_SUCCESS:
+            self._send_packet(self._data_packet(0x0043, template))
+            ret = self._wait_response(0x0043)
+        if ret != self.ERR_SUCCESS:
+            return ret
+        data = bytearray(4)
+        data[0] = fid
+        self._send_packet(self._pack(self.CMD_TYPE, 0x0040, data, 4))
+        ret = self._wait_response(0x0040)
+        if ret == self.ERR_SUCCESS:
+            self._mark(fid, True)
+        return ret
+
+    def relayout(self, popular=True, ids=None):
+        """Pack the enrolled templates into the lowest slots
+
+        With popular, the most matched (see match_stats) come first, so
+        cascade and range searches stay short; otherwise slot order is
+        kept. Templates move through host memory. Returns {old slot: new
+        slot} for every template moved.
+
+        Match stats, groups and the values of ids (any dict of key -> slot
+        the caller keeps) are remapped only once the module has been fully
+        rewritten. On failure, a bus error included, every slot touched is
+        restored, host state is left as it was and None is returned.
+        """
+        if self._slots is None and not self.load_slots():
+            return None
+        moves = self._relayout_plan(popular)
+        if not moves:
+            return moves
+
+        stats = (dict(self.match_stats), list(self._recent))
+        saved = {}
+        try:
+            for old in moves:
+                template = self.upload_template(old)
+                if template is None:
+                    return None
+                saved[old] = template
+        except OSError:  # nothing written yet
+            self._error = "BUS"
+            return None
+
+        ok = self._relayout_write(moves, saved)
+        if not ok:
+            self._relayout_undo(moves, saved)
+        # Stores and deletes above reset the stats of the slots they hit
+        self.match_stats, self._recent = stats
+        if not ok:
+            return None
+        self._relayout_commit(moves, ids)
+        return moves
 
-    def search(self):
-        """Search for matching fingerprint"""
+    def search(self, slots=None):
+        """Search for matching fingerprint
+
+        slots limits the search to a group name (see set_group), a slot,
+        a (start, end) range or a list of those; default is every slot.
+        """
         if self._state != 1:
             return 0
             
-        data = bytearray(6)
-        data[2] = 1
-        data[4] = self.fingerprint_capacity
         self._number = 0
-        
-        header = self._pack(self.CMD_TYPE, 0x0063, data, 6)
-        self._send_packet(header)
-        time.sleep_ms(360)
-        
-        ret = self._response_payload()
+        if slots is None:
+            return self._search_all()
+        return self._search_ranges(self._ranges(slots))[1]
+
+    def cascade_search(self, slots=None):
+        """search() trying the hot slots (see hot_slots) first
+
+        The first tier is at most hot_searches range searches. Only on a
+        miss are the rest of slots searched, against the same feature in
+        RAM, with no recapture. hot_hits counts the matches the first tier
+        found.
+        """
+        if self._state != 1:
+            return 0
+
+        self._number = 0
+        hot, rest = self._tiers(slots)
+        if hot:
+            ret, match = self._search_ranges(hot)
+            if match:
+                self.hot_hits += 1
+            if match or ret == self.ERR_ID809:
+                return match
+        return self._search_ranges(rest)[1]
+
+    def hot_slots(self, n=None):
+        """The n slots most likely to match next, from host match stats
+
+        Half are the most recently matched, the rest the most frequently.
+        """
+        n = self.hot_size if n is None else n
+        hot = self._recent[:(n + 1) // 2]
+        for fid in sorted(self.match_stats, key=self.match_stats.get,
+                          reverse=True):
+            if len(hot) >= n:
+                break
+            if fid not in hot:
+                hot.append(fid)
+        return hot
+
+    def set_group(self, name, slots):
+        """Name a set of slots for search(name), e.g. ('lab-staff', (20, 45))"""
+        self.groups[name] = self._merge_ranges(self._expand(slots))
+
+    def search_ranges(self, slots=None):
+        """The (start, end) searches search(slots) would issue"""
+        return self._ranges(slots)
+
+    def verify(self, fid):
+        """Compare the collected fingerprint with slot fid only
+
+        The 1:1 counterpart of search() for when the claimed ID is already
+        known, e.g. from a badge. Returns fid on a match, else 0.
+        """
+        if self._state != 1:
+            return 0
+
+        self._number = 0
+        ret = self._verify(0, fid)
         if ret == self.ERR_SUCCESS:
+            self._matched(fid)
             return self._buf[0]
         return 0
 
+    def identify(self, timeout=10, retries=2, slots=None, cascade=False):
+        """Wait for a finger, capture, generate and search in one go
+
+        Returns (match_id, timings). match_id is 0 if nothing matched or a
+        step failed. timings holds the ms spent in each stage ('detect',
+        'capture', 'generate', 'search'), the 'total' and the number of
+        'captures'. A rejected image is captured again, up to retries
+        times, while the finger is still down. slots restricts the search
+        as for search(); cascade uses cascade_search().
+        """
+        timings = {'captures': 0}
+        self._number = 0
+        self._state = 0
+        start = t = ticks_ms()
+        found = self.wait_finger(True, timeout)
+        t = self._stage(timings, 'detect', t)
+        if not found:
+            self._error = self._stop() or "TIMEOUT"
+            timings['total'] = ticks_diff(t, start)
+            return 0, timings
+
+        ret = self.ERR_ID809
+        for _ in range(retries + 1):
+            stop = self._stop()
+            if stop:
+                self._error = stop
+                break
+            timings['captures'] += 1
+            ret = self._get_image()
+            t = self._stage(timings, 'capture', t)
+            if ret == self.ERR_SUCCESS:
+                ret = self._generate(0)
+                t = self._stage(timings, 'generate', t)
+                if ret == self.ERR_SUCCESS:
+                    break
+
+        match = 0
+        if ret != self.ERR_SUCCESS and ret != self.ERR_ID809:
+            self._error = "CAPTURE"  # the module kept rejecting the image
+        elif ret == self.ERR_SUCCESS:
+            self._state = 1
+            if cascade:
+                match = self.cascade_search(slots)
+            else:
+                match = self.search(slots)
+            t = self._stage(timings, 'search', t)
+        timings['total'] = ticks_diff(t, start)
+        return match, timings
+
+    def load_slots(self):
+        """Fetch the enrolled-ID list into the host-side slot index
+
+        Afterwards get_empty_id(), is_enrolled() and enrolled_count() are
+        answered without bus traffic; stores and deletes through this
+        driver keep the index current. Call again if another host changes
+        the module. Returns False if the list could not be read.
+        """
+        self._slots = None
+        self._send_packet(self._pack(self.CMD_TYPE, 0x0049, None, 0))
+        if self._wait_response(0x0049) != self.ERR_SUCCESS:
+            return False
+        # The bitmap follows as a separate data packet
+        if self._wait_response(0x0049, data=True) != self.ERR_SUCCESS:
+            return False
+        self._load_bitmap(self._buf)
+        return True
+
+    def enrolled_ids(self):
+        """Enrolled slot IDs in ascending order"""
+        if self._slots is None and not self.load_slots():
+            return None
+        return [fid for fid in range(1, self.fingerprint_capacity + 1)
+                if self._used(fid)]
+
+    def is_enrolled(self, fid):
+        """Whether slot fid holds a template, from the slot index"""
+        if self._slots is None and not self.load_slots():
+            return None
+        return self._used(fid)
+
+    def enrolled_count(self):
+        """Number of enrolled slots, from the slot index"""
+        if self._slots is None and not self.load_slots():
+            return None
+        return self._enrolled
+
+    def get_empty_id(self):
+        """Return the first free slot, ERR_ID809 if none
+
+        Answered from the slot index; falls back to asking the module if
+        the enrolled-ID list cannot be read.
+        """
+        if self._slots is not None or self.load_slots():
+            return self._free_slot()
+
+        data = bytearray(4)
+        data[0] = 1
+        data[2] = self.fingerprint_capacity
+
+        header = self._pack(self.CMD_TYPE, 0x0045, data, 4)
+        self._send_packet(header)
+        ret = self._wait_response(0x0045)
+        if ret == self.ERR_SUCCESS:
+            return self._buf[0]
+        return self.ERR_ID809
+
     # Private helper methods
+    def _relayout_plan(self, popular):
+        """{old slot: new slot} packing enrolled slots from 1 up"""
+        order = [fid for fid in range(1, self.fingerprint_capacity + 1)
+                 if self._used(fid)]
+        if popular:
+            stats = self.match_stats
+            order.sort(key=lambda fid: (-stats.get(fid, 0), fid))
+        moves = {}
+        for new, old in enumerate(order, 1):
+            if new != old:
+                moves[old] = new
+        return moves
+
+    def _relayout_write(self, moves, saved):
+        """Store the moved templates and clear the slots left; True if done"""
+        try:
+            for old, new in moves.items():
+                if self.download_template(new, saved[old]) != self.ERR_SUCCESS:
+                    return False
+            targets = set(moves.values())
+            vacated = [(fid, fid) for fid in moves if fid not in targets]
+            for start, end in self._merge_ranges(vacated):
+                if self._delete(start, end) != self.ERR_SUCCESS:
+                    return False
+                for fid in range(start, end + 1):
+                    self._mark(fid, False)
+        except OSError:
+            self._error = "BUS"
+            return False
+        return True
+
+    def _relayout_undo(self, moves, saved):
+        """Put back what relayout() overwrote or cleared"""
+        error = self._error
+        deadline, self.deadline = self.deadline, None
+        try:
+            for fid in set(moves) | set(moves.values()):
+                try:
+                    if fid in saved:
+                        ret = self.download_template(fid, saved[fid])
+                    else:
+                        ret = self.del_fingerprint(fid)
+                except OSError:
+                    ret = self.ERR_ID809
+                if ret != self.ERR_SUCCESS:
+                    self._slots = None  # no longer known; reload it
+        finally:
+            self.deadline = deadline
+        self._error = error
+
+    def _relayout_commit(self, moves, ids):
+        """Rename slots in the host-side state after a relayout()"""
+        self.match_stats = dict((moves.get(fid, fid), n)
+                                for fid, n in self.match_stats.items())
+        self._recent = [moves.get(fid, fid) for fid in self._recent]
+        # Moved slots follow their template; the rest of a group, empty
+        # slots included, stays, except an empty one a template from
+        # outside the group moved into
+        targets = set(moves.values())
+        for name, ranges in self.groups.items():
+            slots = []
+            for start, end in ranges:
+                for fid in range(start, end + 1):
+                    if fid in moves:
+                        slots.append((moves[fid], moves[fid]))
+                    elif fid not in targets:
+                        slots.append((fid, fid))
+            self.groups[name] = self._merge_ranges(slots)
+        if ids is not None:
+            for key, fid in ids.items():
+                if fid in moves:
+                    ids[key] = moves[fid]
+
+    def _expand(self, slots):
+        """(start, end) ranges for a slots argument of search()"""
+        if slots is None:
+            return [(1, self.fingerprint_capacity)]
+        if isinstance(slots, str):
+            return list(self.groups[slots])
+        if isinstance(slots, int):
+            return [(slots, slots)]
+        if (isinstance(slots, tuple) and len(slots) == 2 and
+                isinstance(slots[0], int) and isinstance(slots[1], int)):
+            return [slots]
+        ranges = []
+        for item in slots:
+            ranges.extend(self._expand(item))
+        return ranges
+
+    def _merge_ranges(self, ranges):
+        """Sorted, clipped to the capacity, overlaps and neighbours joined"""
+        merged = []
+        for start, end in sorted(ranges):
+            start = max(start, 1)
+            end = min(end, self.fingerprint_capacity)
+            if start > end:
+                continue
+            if merged and start <= merged[-1][1] + 1:
+                if end > merged[-1][1]:
+                    merged[-1] = (merged[-1][0], end)
+            else:
+                merged.append((start, end))
+        return merged
+
+    def _ranges(self, slots, skip=None):
+        """Fewest range searches covering slots
+
+        For an explicit selection with the slot index loaded, empty slots
+        are trimmed from the ends of each range. Ranges are never joined
+        across slots outside the selection, however empty the index says
+        they are: it misses templates enrolled by other hosts or drivers,
+        and one of those must not match a group search. For the same
+        reason the default (every slot) is never trimmed. Slots in skip
+        are known not to match and are treated as empty.
+        """
+        ranges = self._merge_ranges(self._expand(slots))
+        index = slots is not None and self._slots is not None
+        if not index and not skip:
+            return ranges
+
+        def idle(fid):
+            if skip and fid in skip:
+                return True
+            return index and not self._used(fid)
+
+        out = []
+        for start, end in ranges:
+            while start <= end and idle(start):
+                start += 1
+            while end >= start and idle(end):
+                end -= 1
+            if start <= end:
+                out.append((start, end))
+        return out
+
+    def _tiers(self, slots):
+        """(hot ranges, remaining ranges) for a cascade over slots
+
+        The hot tier takes hot slots in rank order as long as they fit in
+        hot_searches ranges spanning at most hot_span slots, so a miss
+        costs a bounded extra search rather than one per hot slot. Slots
+        the tier scanned are skipped by the rest.
+        """
+        if not self.poll:
+            # Each search waits its full CMD_DELAY: a tier cannot save time
+            return [], self._ranges(slots)
+        selected = self._merge_ranges(self._expand(slots))
+        hot = []
+        tier = []
+        for fid in self.hot_slots():
+            if not any(start <= fid <= end for start, end in selected):
+                continue
+            cover = self._cover(hot + [fid], selected)
+            if cover:
+                hot.append(fid)
+                tier = cover
+        if not tier:
+            return [], self._ranges(slots)
+        done = set()
+        for start, end in tier:
+            done.update(range(start, end + 1))
+        return tier, self._ranges(slots, done)
+
+    def _cover(self, fids, selected):
+        """Tightest <= hot_searches ranges over fids within selected
+
+        None if that takes more searches or spans more than hot_span slots.
+        """
+        fids = sorted(fids)
+        part = [i for fid in fids
+                for i, (start, end) in enumerate(selected) if start <= fid <= end]
+        cuts = []
+        gaps = []
+        for i in range(len(fids) - 1):
+            if part[i] != part[i + 1]:
+                cuts.append(i)  # a range never spans unselected slots
+            else:
+                gaps.append((fids[i + 1] - fids[i], i))
+        extra = self.hot_searches - 1 - len(cuts)
+        if extra < 0:
+            return None
+        gaps.sort(reverse=True)
+        cuts.extend(i for _, i in gaps[:extra])
+        cuts.sort()
+        cover = []
+        start = fids[0]
+        for i in cuts:
+            cover.append((start, fids[i]))
+            start = fids[i + 1]
+        cover.append((start, fids[-1]))
+        span = self.hot_span or self.fingerprint_capacity >> 3
+        if sum(end - start + 1 for start, end in cover) > span:
+            return None
+        return cover
+
+    def _search_all(self):
+        """Search every slot; the match or 0, without building a plan"""
+        if self._search(0, 1, self.fingerprint_capacity) != self.ERR_SUCCESS:
+            return 0
+        match = self._buf[0]
+        self._matched(match)
+        return match
+
+    def _search_ranges(self, ranges):
+        """Search RAM buffer 0 over ranges; (last RET, match or 0)"""
+        ret = self.ERR_SUCCESS
+        for start, end in ranges:
+            ret = self._search(0, start, end)
+            if ret == self.ERR_SUCCESS:
+                match = self._buf[0]
+                self._matched(match)
+                return ret, match
+            if ret == self.ERR_ID809:
+                break
+        return ret, 0
+
+    def _matched(self, fid):
+        """Update the match stats behind hot_slots()"""
+        self.match_stats[fid] = self.match_stats.get(fid, 0) + 1
+        recent = self._recent
+        if fid in recent:
+            recent.remove(fid)
+        recent.insert(0, fid)
+        del recent[self.hot_size:]
+
+    def _used(self, fid):
+        return bool(self._slots[fid >> 3] & (1 << (fid & 7)))
+
+    def _load_bitmap(self, bitmap):
+        """Build the slot index from an enrolled-ID bitmap (bit n = slot n)"""
+        capacity = self.fingerprint_capacity
+        slots = bytearray((capacity >> 3) + 1)
+        n = min(len(bitmap), len(slots))
+        slots[0:n] = bitmap[0:n]
+        slots[0] &= 0xFE  # there is no slot 0
+        self._slots = slots
+        self._enrolled = sum(1 for fid in range(1, capacity + 1)
+                             if slots[fid >> 3] & (1 << (fid & 7)))
+
+    def _mark(self, fid, used):
+        """Record a store (used) or delete in the slot index"""
+        # Whoever matched this slot before, it holds someone else now
+        if fid == self.DELALL and not used:
+            self.match_stats = {}
+            self._recent = []
+        else:
+            self.match_stats.pop(fid, None)
+            if fid in self._recent:
+                self._recent.remove(fid)
+
+        slots = self._slots
+        if slots is None:
+            return
+        if fid == self.DELALL and not used:
+            for i in range(len(slots)):
+                slots[i] = 0
+            self._enrolled = 0
+            return
+        if not 1 <= fid <= self.fingerprint_capacity:
+            return
+        bit = 1 << (fid & 7)
+        if bool(slots[fid >> 3] & bit) != used:
+            slots[fid >> 3] ^= bit
+            self._enrolled += 1 if used else -1
+
+    def _free_slot(self):
+        """Lowest free slot from the index, ERR_ID809 if full"""
+        slots = self._slots
+        for i in range(len(slots)):
+            if slots[i] != 0xFF:
+                for fid in range(i << 3, (i << 3) + 8):
+                    if (1 <= fid <= self.fingerprint_capacity and
+                            not slots[i] & (1 << (fid & 7))):
+                        return fid
+        return self.ERR_ID809
+
+    def _presence_interval(self, wait):
+        """Next presence poll interval after one of wait ms"""
+        profile = self.presence_profile
+        if (self._activity is not None and
+                ticks_diff(ticks_ms(), self._activity) < profile['hold_ms']):
+            return profile['fast_ms']
+        return min(max(wait * 2, profile['fast_ms']), profile['idle_ms'])
+
+    def _stage(self, timings, name, t):
+        """Add the ms since t to timings[name]; return now"""
+        now = ticks_ms()
+        timings[name] = timings.get(name, 0) + ticks_diff(now, t)
+        return now
+
+    def _led_frame(self, mode, color, blink_count):
+        """Cached LED frame for this device variant"""
+        key = (self.fingerprint_capacity, mode, color, blink_count)
+        frame = self._led_frames.get(key)
+        if frame is None:
+            if self.fingerprint_capacity == 80:
+                data = bytes((mode, color, color, blink_count))
+            else:
+                # 200 capacity devices number modes and colors differently
+                m = self.LED_MODE_200[mode] if 0 < mode < 8 else mode
+                c = self.LED_COLOR_200[color] if 0 < color < 8 else 0x87
+                data = bytes((m, c, c, 0))
+            frame = bytes(self._build(self.CMD_TYPE, 0x0024, data, 4, bytearray(26)))
+            self._led_frames[key] = frame
+        return frame
+
+    def _led_acked(self, state, ret):
+        """Remember an acknowledged steady LED state for diffing"""
+        mode, color, blink_count = state
+        steady = mode in (3, 4) or (mode in (1, 2, 7) and not blink_count)
+        if ret == self.ERR_SUCCESS and steady:
+            self._led_state = state
+        else:
+            self._led_state = None
+
+    def _defer(self, led_state=None):
+        """Leave the response of the command just sent for flush()"""
+        self._deferred = self._cmd
+        self._deferred_at = ticks_ms()
+        self._deferred_led = led_state
+
+    def _deferred_done(self, cmd, ret):
+        """Book-keeping once a deferred response has been read"""
+        if cmd == 0x0024 and self._deferred_led:
+            self._led_acked(self._deferred_led, ret)
+        if ret != self.ERR_SUCCESS:
+            self.deferred_error = (cmd, self._error)
+            if self.on_deferred_error:
+                self.on_deferred_error(cmd, self._error)
+        return ret
+
     def _send_packet(self, packet):
         """Send command packet to sensor"""
-        self.i2c.writeto(self.addr, packet)
+        if self._deferred:
+            self.flush()
+        self._cmd = packet[4] << 8 | packet[5]
+        step = self.bus.MAX_TRANSFER
+        if not step or len(packet) <= step:
+            if self.poll and self.bus.COMBINED:
+                # Take the first readiness probe in the same transaction;
+                # one round trip instead of a write and a separate read
+                self.bus.write_read(packet, self._rxv[0:self.RCM_PROBE])
+                self._probed = True
+            else:
+                self.bus.write(packet)
+            return
+        view = memoryview(packet)
+        for i in range(0, len(packet), step):
+            self.bus.write(view[i:i + step])
+
+    def _read(self, view):
+        """Fill view from the bus, split to the transport's transfer limit"""
+        step = self.bus.MAX_TRANSFER
+        if not step or len(view) <= step:
+            self.bus.readinto(view)
+            return
+        for i in range(0, len(view), step):
+            self.bus.readinto(view[i:i + step])
         
-    def _response_payload(self):
-        """Read response from sensor"""
-        try:
-            data = self.i2c.readfrom(self.addr, 32)
-            if data[0] != 0xee:
+    def _wait_response(self, cmd, start=None, data=False, slots=0):
+        """Wait for a command to complete and read its response
+
+        With polling on, the busy byte is probed with a growing backoff until
+        the module answers or twice the nominal delay has passed. Once the
+        command has completed before, probing starts at its expected
+        completion instead, skipping the busy probes. start is
+        when the command was sent, if not just now; data expects a data
+        packet (0x5AA5) rather than a response; slots is how many slots a
+        search scans, see _aim().
+        """
+        delay = self.CMD_DELAY[cmd]
+        if start is None:
+            start = ticks_ms()
+        if not self.poll:
+            left = max(0, delay - ticks_diff(ticks_ms(), start))
+            if self._left(left) < left or self._stop():
+                sleep_ms(self._left(left))
+                return self._abandon(start)
+            sleep_ms(left)
+            return self._response_payload(None, data)
+
+        wait = self.POLL_MIN_MS
+        aim = self._aim(cmd, slots)
+        busy = None
+        while True:
+            first = self._probe()
+            elapsed = ticks_diff(ticks_ms(), start)
+            if first is not None:
+                self._completed(cmd, elapsed, busy, slots)
+                return self._response_payload(first, data)
+            if elapsed >= delay * self.POLL_DEADLINE:
+                self._error = "REPLY_TIMEOUT"
                 return self.ERR_ID809
-            return self.ERR_SUCCESS
-        except:
+            if self._stop():
+                return self._abandon(start)
+            if elapsed < aim:
+                sleep_ms(self._left(aim - elapsed))
+                continue
+            busy = elapsed
+            sleep_ms(self._left(wait))
+            wait = min(wait * 2, self.POLL_MAX_MS)
+
+    def _completed(self, cmd, elapsed, busy, slots=0):
+        """Note that cmd answered elapsed ms after it was sent
+
+        busy is when a probe last found the module still busy, None if the
+        first probe aimed at the expected completion already found it done.
+        The next wait aims halfway between the two, or a little earlier
+        than elapsed when nothing brackets the completion. For a search,
+        only a scan at least as wide as the one behind the aim updates it.
+        """
+        self.saved_ms[cmd] = self.CMD_DELAY[cmd] - elapsed
+        if slots:
+            if slots < self._done_slots.get(cmd, 0):
+                return
+            self._done_slots[cmd] = slots
+        if busy is None:
+            self._done_ms[cmd] = max(0, elapsed - self.POLL_MIN_MS)
+        else:
+            self._done_ms[cmd] = (busy + elapsed) >> 1
+
+    def _aim(self, cmd, slots=0):
+        """ms after sending cmd to probe first; 0 probes at once
+
+        A search takes longer the more slots it scans, so a narrower one
+        aims at its share of the widest scan's time, never later than due.
+        """
+        aim = self._done_ms.get(cmd, 0)
+        widest = self._done_slots.get(cmd, 0)
+        if slots and slots < widest:
+            aim = aim * slots // widest
+        return aim
+
+    def _stop(self):
+        """Error tag if the active deadline says stop, else None"""
+        if self.deadline:
+            return self.deadline.stop()
+        return None
+
+    def _left(self, ms):
+        """ms capped by what the active deadline has left"""
+        if self.deadline:
+            remaining = self.deadline.remaining()
+            if remaining is not None and remaining < ms:
+                return remaining
+        return ms
+
+    def _abandon(self, start):
+        """Give up on the command in progress; flush() drains its reply"""
+        self._error = self._stop() or "DEADLINE"
+        self._deferred = self._cmd
+        self._deferred_at = start
+        self._deferred_led = None
+        return self.ERR_ID809
+
+    def _probe(self):
+        """Read the start of the response into the receive buffer
+
+        Reads RCM_PROBE bytes, so a probe that finds the module ready has
+        also fetched the header. Returns None while the module is still
+        busy. The first probe after a combined write_read has already been
+        read by _send_packet.
+        """
+        if self._probed:
+            self._probed = False
+        else:
+            try:
+                self._read(self._rxv[0:self.RCM_PROBE])
+            except OSError:
+                return None
+        if self._rx[0] == self.BUSY:
+            return None
+        return self._rx[0]
+
+    def _response_payload(self, first=None, data=False):
+        """Read and decode a response frame
+
+        Frame: PREFIX(2) SID DID RCM(2) LEN(2) RET(2) DATA(LEN-2) CKS(2).
+        The first RCM_PROBE bytes are read first (first is not None if a
+        probe already read them), then the rest of the frame as given by
+        LEN. On success self._buf is a memoryview of DATA in the
+        preallocated receive buffer and the RET code is returned. data
+        expects the RCM_DATA prefix.
+        """
+        rx = self._rx
+        rxv = self._rxv
+        head = self.RCM_PROBE
+        try:
+            if first is None:
+                self._read(rxv[0:head])
+        except OSError:
+            self._error = "BUS"
             return self.ERR_ID809
-            
+        if rx[0] == self.BUSY:
+            self._error = "BUSY"
+            return self.ERR_ID809
+
+        prefix, rcm, length, ret = struct.unpack_from('>H2xHHH', rx, 0)
+        end = self.RCM_HEADER - 2 + length
+        expect = self.RCM_DATA_PREFIX_CODE if data else self.RCM_PREFIX_CODE
+        if prefix != expect or length < 2 or end + 2 > len(rx):
+            self._error = "FRAME"
+            return self.ERR_ID809
+        try:
+            if end + 2 > head:
+                self._read(rxv[head:end + 2])
+        except OSError:
+            self._error = "BUS"
+            return self.ERR_ID809
+
+        cks = (0xFF + sum(rxv[2:end])) & 0xFFFF
+        if cks != (rx[end] << 8 | rx[end + 1]) or rcm != self._cmd:
+            self._error = "FRAME"
+            return self.ERR_ID809
+
+        self._buf = rxv[self.RCM_HEADER:end]
+        return ret
+
     def _pack(self, cmd_type, cmd, payload, length):
-        """Pack command packet"""
-        packet = bytearray(26)
+        """Pack command packet
+
+        Payload-less command frames never change, so they are built once and
+        cached as bytes. Other frames are patched into one reusable buffer,
+        which is only valid until the next call.
+        """
+        if not length and cmd_type == self.CMD_TYPE:
+            frame = self._frames.get(cmd)
+            if frame is None:
+                frame = bytes(self._build(cmd_type, cmd, None, 0, bytearray(26)))
+                self._frames[cmd] = frame
+            return frame
+        return self._build(cmd_type, cmd, payload, length, self._tx)
+
+    def _build(self, cmd_type, cmd, payload, length, packet):
+        """Write a frame into packet and return it"""
         if cmd_type == self.CMD_TYPE:
             struct.pack_into('>H', packet, 0, self.CMD_PREFIX_CODE)
         else:
             struct.pack_into('>H', packet, 0, self.CMD_DATA_PREFIX_CODE)
-            
+
         packet[2] = 0  # SID
         packet[3] = 0  # DID
-        struct.pack_into('>H', packet, 4, cmd)
-        struct.pack_into('>H', packet, 6, length)
-        
+        struct.pack_into('>HH', packet, 4, cmd, length)
+
+        # Checksum is 0xFF plus every byte from SID on; the header part is
+        # known from cmd and length, so only the payload needs summing
+        cks = 0xFF + (cmd >> 8) + (cmd & 0xFF) + (length >> 8) + (length & 0xFF)
         if payload:
             packet[8:8+length] = payload
-            
-        # Calculate checksum
-        cks = 0xFF
-        for i in range(2, 8+length):
-            cks += packet[i]
+            cks += sum(payload)
         struct.pack_into('>H', packet, 8+length, cks & 0xFFFF)
-        
+
+        # Clear whatever a longer previous frame left behind
+        for i in range(10+length, 26):
+            packet[i] = 0
+
         return packet
 
     def _get_image(self):
         """Capture fingerprint image"""
         header = self._pack(self.CMD_TYPE, 0x0020, None, 0)
         self._send_packet(header)
-        time.sleep_ms(360)
-        return self._response_payload()
+        return self._wait_response(0x0020)
+
+    def _delete(self, start, end):
+        """Clear slots start..end on the module; the index is left alone"""
+        data = bytearray(4)
+        struct.pack_into('<HH', data, 0, start, end)
+        self._send_packet(self._pack(self.CMD_TYPE, 0x0044, data, 4))
+        return self._wait_response(0x0044)
+
+    def _rx_room(self, size):
+        """Grow the receive buffer for a data packet announced by size
+
+        size is the response DATA holding the packet's data length.
+        """
+        if len(size) < 2:
+            return
+        need = self.RCM_HEADER + struct.unpack_from('<H', size, 0)[0] + 2
+        if need > len(self._rx):
+            self._rx = bytearray(need)
+            self._rxv = memoryview(self._rx)
+
+    def _data_packet(self, cmd, data):
+        """Command data packet (0xA55A) for RAM buffer 0, sized to data"""
+        payload = bytearray(2) + data
+        length = len(payload)
+        return self._build(self.DATA_TYPE, cmd, payload, length,
+                           bytearray(max(26, length + 10)))
+
+    def _search(self, ram_id, start, end):
+        """Search slots start..end for the template in RAM buffer ram_id"""
+        data = bytearray(6)
+        struct.pack_into('<HHH', data, 0, ram_id, start, end)
+        self._send_packet(self._pack(self.CMD_TYPE, 0x0063, data, 6))
+        return self._wait_response(0x0063, slots=end - start + 1)
+
+    def _verify(self, ram_id, fid):
+        """Match the template in RAM buffer ram_id against slot fid"""
+        data = bytearray(4)
+        struct.pack_into('<HH', data, 0, fid, ram_id)
+        self._send_packet(self._pack(self.CMD_TYPE, 0x0064, data, 4))
+        return self._wait_response(0x0064)
 
     def _generate(self, ram_id):
         """Generate fingerprint template"""
@@ -209,8 +1248,7 @@ class ID809:
         data[0] = ram_id
         header = self._pack(self.CMD_TYPE, 0x0060, data, 2)
         self._send_packet(header)
-        time.sleep_ms(360)
-        return self._response_payload()
+        return self._wait_response(0x0060)
 
     def _merge(self):
         """Merge fingerprint templates"""
@@ -218,5 +1256,4 @@ class ID809:
         data[2] = self._number
         header = self._pack(self.CMD_TYPE, 0x0061, data, 3)
         self._send_packet(header)
-        time.sleep_ms(360)
-        return self._response_payload()
+        return self._wait_response(0x0061)
@@ -0,0 +1,478 @@
+"""asyncio / uasyncio variant of the ID809 driver
+
+Same protocol core and transports as id809.ID809, but every wait between
+sending a command and reading its response is an await, so the event loop
+keeps running the network stack, relays and display meanwhile:
+
+    fp = AsyncID809(i2c)
+    await fp.begin()
+    if await fp.collection_fingerprint(10) == 0:
+        match = await fp.search()
+"""
+try:
+    import asyncio
+except ImportError:  # older MicroPython
+    import uasyncio as asyncio
+
+import struct
+
+from id809 import ID809, ticks_ms, ticks_diff
+
+if hasattr(asyncio, 'sleep_ms'):
+    sleep_ms = asyncio.sleep_ms
+else:  # CPython
+    async def sleep_ms(ms):
+        await asyncio.sleep(ms / 1000)
+
+
+class AsyncID809(ID809):
+    """ID809 with awaitable commands"""
+
+    async def begin(self):
+        """Initialize the sensor"""
+        self._led_state = None
+        self._slots = None
+        device_info = await self.get_device_info()
+        if device_info:
+            if device_info[-1] == '4':
+                self.fingerprint_capacity = 80
+            elif device_info[-1] == '3':
+                self.fingerprint_capacity = 200
+            return True
+        return False
+
+    async def get_device_info(self):
+        """Read the module's version string, None on failure"""
+        ret = await self._command(0x0004)
+        if ret == self.ERR_SUCCESS:
+            return bytes(self._buf).decode()
+        return None
+
+    async def is_connected(self):
+        """Test connection with sensor"""
+        return await self._command(0x0001) == self.ERR_SUCCESS
+
+    async def ctrl_led(self, mode, color, blink_count, wait=True):
+        """Control the LED ring; see ID809.ctrl_led"""
+        state = (mode, color, blink_count)
+        if state == self._led_state:
+            return self.ERR_SUCCESS
+        await self.flush()
+        self._led_state = None
+        self._send_packet(self._led_frame(mode, color, blink_count))
+        if not wait:
+            self._defer(state)
+            return self.ERR_SUCCESS
+        ret = await self._wait_response(0x0024)
+        self._led_acked(state, ret)
+        return ret
+
+    async def flush(self):
+        """Await the acknowledgement of a command sent with wait=False"""
+        if not self._deferred:
+            return self.ERR_SUCCESS
+        cmd, start = self._deferred, self._deferred_at
+        self._deferred = 0
+        deadline, self.deadline = self.deadline, None
+        try:
+            ret = await self._wait_response(cmd, start)
+        finally:
+            self.deadline = deadline
+        return self._deferred_done(cmd, ret)
+
+    async def detect_finger(self):
+        """Detect if finger is present"""
+        ret = await self._command(0x0021)
+        if ret == self.ERR_SUCCESS:
+            return self._buf[0]
+        return 0
+
+    async def wait_finger(self, present, timeout):
+        """Wait until a finger is placed (True) or removed (False)
+
+        Polled like ID809.wait_finger when there is no IRQ source.
+        """
+        start = ticks_ms()
+        seen = 0
+        wait = 0
+        while True:
+            if self.presence:
+                # The IRQ line is a pin read, not a bus transaction
+                if self.presence.present() == present:
+                    return True
+                wait = 10
+            elif bool(await self.detect_finger()) == present:
+                seen += 1
+                self._activity = ticks_ms()
+                if seen >= self.presence_profile['confirm']:
+                    return True
+            else:
+                seen = 0
+            remaining = self._left(timeout * 1000 - ticks_diff(ticks_ms(), start))
+            if remaining <= 0 or self._stop():
+                return False
+            if not self.presence:
+                wait = self._presence_interval(wait)
+            await sleep_ms(min(wait, remaining))
+
+    async def collection_fingerprint(self, timeout):
+        """Collect fingerprint image"""
+        if self._number > 2:
+            self._error = "GATHER_OUT"
+            return self.ERR_ID809
+
+        if not await self.wait_finger(True, timeout):
+            self._error = self._stop() or "TIMEOUT"
+            self._state = 0
+            return self.ERR_ID809
+
+        ret = await self._get_image()
+        if ret != self.ERR_SUCCESS:
+            self._state = 0
+            return self.ERR_ID809
+
+        ret = await self._generate(self._number)
+        if ret != self.ERR_SUCCESS:
+            self._state = 0
+            return self.ERR_ID809
+
+        self._number += 1
+        self._state = 1
+        return ret
+
+    async def store_fingerprint(self, fid):
+        """Store collected fingerprint"""
+        ret = await self._merge()
+        if ret != self.ERR_SUCCESS:
+            return self.ERR_ID809
+
+        self._number = 0
+        data = bytearray(4)
+        data[0] = fid
+        ret = await self._command(0x0040, data, 4)
+        if ret == self.ERR_SUCCESS:
+            self._mark(fid, True)
+        return ret
+
+    async def del_fingerprint(self, fid):
+        """Delete one slot, or every slot with DELALL"""
+        if fid == self.DELALL:
+            ret = await self._delete(1, self.fingerprint_capacity)
+        else:
+            ret = await self._delete(fid, fid)
+        if ret == self.ERR_SUCCESS:
+            self._mark(fid, False)
+        return ret
+
+    async def upload_template(self, fid):
+        """Read the template in slot fid; see ID809.upload_template"""
+        self._state = 0
+        data = bytearray(4)
+        struct.pack_into('<HH', data, 0, fid, 0)
+        if await self._command(0x0041, data, 4) != self.ERR_SUCCESS:
+            return None
+        if await self._command(0x0042, bytearray(2), 2) != self.ERR_SUCCESS:
+            return None
+        self._rx_room(self._buf)
+        if await self._wait_response(0x0042, data=True) != self.ERR_SUCCESS:
+            return None
+        return bytes(self._buf)
+
+    async def download_template(self, fid, template):
+        """Store a template from upload_template() in slot fid"""
+        self._state = 0
+        data = bytearray(2)
+        struct.pack_into('<H', data, 0, len(template) + 2)
+        ret = await self._command(0x0043, data, 2)
+        if ret == self.ERR_SUCCESS:
+            self._send_packet(self._data_packet(0x0043, template))
+            ret = await self._wait_response(0x0043)
+        if ret != self.ERR_SUCCESS:
+            return ret
+        data = bytearray(4)
+        data[0] = fid
+        ret = await self._command(0x0040, data, 4)
+        if ret == self.ERR_SUCCESS:
+            self._mark(fid, True)
+        return ret
+
+    async def relayout(self, popular=True, ids=None):
+        """Pack the enrolled templates into the lowest slots
+
+        See ID809.relayout.
+        """
+        if self._slots is None and not await self.load_slots():
+            return None
+        moves = self._relayout_plan(popular)
+        if not moves:
+            return moves
+
+        stats = (dict(self.match_stats), list(self._recent))
+        saved = {}
+        try:
+            for old in moves:
+                template = await self.upload_template(old)
+                if template is None:
+                    return None
+                saved[old] = template
+        except OSError:  # nothing written yet
+            self._error = "BUS"
+            return None
+
+        ok = await self._relayout_write(moves, saved)
+        if not ok:
+            await self._relayout_undo(moves, saved)
+        self.match_stats, self._recent = stats
+        if not ok:
+            return None
+        self._relayout_commit(moves, ids)
+        return moves
+
+    async def load_slots(self):
+        """Fetch the enrolled-ID list; see ID809.load_slots"""
+        self._slots = None
+        if await self._command(0x0049) != self.ERR_SUCCESS:
+            return False
+        if await self._wait_response(0x0049, data=True) != self.ERR_SUCCESS:
+            return False
+        self._load_bitmap(self._buf)
+        return True
+
+    async def enrolled_ids(self):
+        """Enrolled slot IDs in ascending order"""
+        if self._slots is None and not await self.load_slots():
+            return None
+        return ID809.enrolled_ids(self)
+
+    async def is_enrolled(self, fid):
+        """Whether slot fid holds a template, from the slot index"""
+        if self._slots is None and not await self.load_slots():
+            return None
+        return ID809.is_enrolled(self, fid)
+
+    async def enrolled_count(self):
+        """Number of enrolled slots, from the slot index"""
+        if self._slots is None and not await self.load_slots():
+            return None
+        return self._enrolled
+
+    async def search(self, slots=None):
+        """Search for matching fingerprint; see ID809.search for slots"""
+        if self._state != 1:
+            return 0
+
+        self._number = 0
+        if slots is None:
+            if await self._search(0, 1, self.fingerprint_capacity) != self.ERR_SUCCESS:
+                return 0
+            match = self._buf[0]
+            self._matched(match)
+            return match
+        return (await self._search_ranges(self._ranges(slots)))[1]
+
+    async def cascade_search(self, slots=None):
+        """Hot slots first, then the rest; see ID809.cascade_search"""
+        if self._state != 1:
+            return 0
+
+        self._number = 0
+        hot, rest = self._tiers(slots)
+        if hot:
+            ret, match = await self._search_ranges(hot)
+            if match:
+                self.hot_hits += 1
+            if match or ret == self.ERR_ID809:
+                return match
+        return (await self._search_ranges(rest))[1]
+
+    async def verify(self, fid):
+        """Compare the collected fingerprint with slot fid only"""
+        if self._state != 1:
+            return 0
+
+        self._number = 0
+        ret = await self._verify(0, fid)
+        if ret == self.ERR_SUCCESS:
+            self._matched(fid)
+            return self._buf[0]
+        return 0
+
+    async def identify(self, timeout=10, retries=2, slots=None,
+                       cascade=False):
+        """Detect, capture, generate and search; see ID809.identify"""
+        timings = {'captures': 0}
+        self._number = 0
+        self._state = 0
+        start = t = ticks_ms()
+        found = await self.wait_finger(True, timeout)
+        t = self._stage(timings, 'detect', t)
+        if not found:
+            self._error = self._stop() or "TIMEOUT"
+            timings['total'] = ticks_diff(t, start)
+            return 0, timings
+
+        ret = self.ERR_ID809
+        for _ in range(retries + 1):
+            stop = self._stop()
+            if stop:
+                self._error = stop
+                break
+            timings['captures'] += 1
+            ret = await self._get_image()
+            t = self._stage(timings, 'capture', t)
+            if ret == self.ERR_SUCCESS:
+                ret = await self._generate(0)
+                t = self._stage(timings, 'generate', t)
+                if ret == self.ERR_SUCCESS:
+                    break
+
+        match = 0
+        if ret != self.ERR_SUCCESS and ret != self.ERR_ID809:
+            self._error = "CAPTURE"  # the module kept rejecting the image
+        elif ret == self.ERR_SUCCESS:
+            self._state = 1
+            if cascade:
+                match = await self.cascade_search(slots)
+            else:
+                match = await self.search(slots)
+            t = self._stage(timings, 'search', t)
+        timings['total'] = ticks_diff(t, start)
+        return match, timings
+
+    async def get_empty_id(self):
+        """Return the first free slot, ERR_ID809 if none"""
+        if self._slots is not None or await self.load_slots():
+            return self._free_slot()
+
+        data = bytearray(4)
+        data[0] = 1
+        data[2] = self.fingerprint_capacity
+
+        ret = await self._command(0x0045, data, 4)
+        if ret == self.ERR_SUCCESS:
+            return self._buf[0]
+        return self.ERR_ID809
+
+    async def _get_image(self):
+        """Capture fingerprint image"""
+        return await self._command(0x0020)
+
+    async def _search(self, ram_id, start, end):
+        """Search slots start..end for the template in RAM buffer ram_id"""
+        data = bytearray(6)
+        struct.pack_into('<HHH', data, 0, ram_id, start, end)
+        return await self._command(0x0063, data, 6, end - start + 1)
+
+    async def _relayout_write(self, moves, saved):
+        """Store the moved templates and clear the slots left; True if done"""
+        try:
+            for old, new in moves.items():
+                if await self.download_template(new, saved[old]) != self.ERR_SUCCESS:
+                    return False
+            targets = set(moves.values())
+            vacated = [(fid, fid) for fid in moves if fid not in targets]
+            for start, end in self._merge_ranges(vacated):
+                if await self._delete(start, end) != self.ERR_SUCCESS:
+                    return False
+                for fid in range(start, end + 1):
+                    self._mark(fid, False)
+        except OSError:
+            self._error = "BUS"
+            return False
+        return True
+
+    async def _relayout_undo(self, moves, saved):
+        """Put back what relayout() overwrote or cleared"""
+        error = self._error
+        deadline, self.deadline = self.deadline, None
+        try:
+            for fid in set(moves) | set(moves.values()):
+                try:
+                    if fid in saved:
+                        ret = await self.download_template(fid, saved[fid])
+                    else:
+                        ret = await self.del_fingerprint(fid)
+                except OSError:
+                    ret = self.ERR_ID809
+                if ret != self.ERR_SUCCESS:
+                    self._slots = None
+        finally:
+            self.deadline = deadline
+        self._error = error
+
+    async def _delete(self, start, end):
+        """Clear slots start..end on the module; the index is left alone"""
+        data = bytearray(4)
+        struct.pack_into('<HH', data, 0, start, end)
+        return await self._command(0x0044, data, 4)
+
+    async def _search_ranges(self, ranges):
+        """Search RAM buffer 0 over ranges; (last RET, match or 0)"""
+        ret = self.ERR_SUCCESS
+        for start, end in ranges:
+            ret = await self._search(0, start, end)
+            if ret == self.ERR_SUCCESS:
+                match = self._buf[0]
+                self._matched(match)
+                return ret, match
+            if ret == self.ERR_ID809:
+                break
+        return ret, 0
+
+    async def _verify(self, ram_id, fid):
+        """Match the template in RAM buffer ram_id against slot fid"""
+        data = bytearray(4)
+        struct.pack_into('<HH', data, 0, fid, ram_id)
+        return await self._command(0x0064, data, 4)
+
+    async def _generate(self, ram_id):
+        """Generate fingerprint template"""
+        data = bytearray(2)
+        data[0] = ram_id
+        return await self._command(0x0060, data, 2)
+
+    async def _merge(self):
+        """Merge fingerprint templates"""
+        data = bytearray(3)
+        data[2] = self._number
+        return await self._command(0x0061, data, 3)
+
+    async def _command(self, cmd, data=None, length=0, slots=0):
+        """Send a command and await its response code"""
+        await self.flush()
+        self._send_packet(self._pack(self.CMD_TYPE, cmd, data, length))
+        return await self._wait_response(cmd, slots=slots)
+
+    async def _wait_response(self, cmd, start=None, data=False, slots=0):
+        """Await command completion; see ID809._wait_response"""
+        delay = self.CMD_DELAY[cmd]
+        if start is None:
+            start = ticks_ms()
+        if not self.poll:
+            left = max(0, delay - ticks_diff(ticks_ms(), start))
+            if self._left(left) < left or self._stop():
+                await sleep_ms(self._left(left))
+                return self._abandon(start)
+            await sleep_ms(left)
+            return self._response_payload(None, data)
+
+        wait = self.POLL_MIN_MS
+        aim = self._aim(cmd, slots)
+        busy = None
+        while True:
+            first = self._probe()
+            elapsed = ticks_diff(ticks_ms(), start)
+            if first is not None:
+                self._completed(cmd, elapsed, busy, slots)
+                return self._response_payload(first, data)
+            if elapsed >= delay * self.POLL_DEADLINE:
+                self._error = "REPLY_TIMEOUT"
+                return self.ERR_ID809
+            if self._stop():
+                return self._abandon(start)
+            if elapsed < aim:
+                await sleep_ms(self._left(aim - elapsed))
+                continue
+            busy = elapsed
+            await sleep_ms(self._left(wait))
+            wait = min(wait * 2, self.POLL_MAX_MS)
@@ -0,0 +1,104 @@
+"""Finger presence from the ID809 IRQ line
+
+The sensor drives IRQ high while a finger touches the window. A presence
+source turns that line into two calls the driver can block on:
+
+    present()                -> current state
+    wait(present, timeout)   -> True once the state matches, False on timeout
+
+Pass one to ID809(..., presence=...) and placement/removal waits block on
+an edge instead of polling detect_finger() over I2C.
+"""
+import time
+
+
+class PinPresence:
+    """MicroPython machine.Pin with an edge IRQ"""
+
+    def __init__(self, pin, active_high=True):
+        from machine import Pin
+        if isinstance(pin, int):
+            pin = Pin(pin, Pin.IN)
+        self.pin = pin
+        self.active_high = active_high
+        self._edge = False
+        pin.irq(trigger=Pin.IRQ_RISING | Pin.IRQ_FALLING, handler=self._irq)
+
+    def _irq(self, pin):
+        self._edge = True
+
+    def present(self):
+        return bool(self.pin.value()) == self.active_high
+
+    def wait(self, present, timeout):
+        import machine
+        start = time.ticks_ms()
+        while True:
+            # Cleared before reading the level, so an edge in between is kept
+            self._edge = False
+            if self.present() == present:
+                return True
+            while not self._edge:
+                if time.ticks_diff(time.ticks_ms(), start) > timeout * 1000:
+                    return False
+                # Any interrupt ends idle(); only the edge IRQ ends the wait
+                machine.idle()
+
+    def close(self):
+        self.pin.irq(handler=None)
+
+
+class GpiochipPresence:
+    """Linux GPIO character device line, via libgpiod (python3-libgpiod)"""
+
+    def __init__(self, line=21, chip='gpiochip0', active_high=True,
+                 consumer='id809'):
+        import gpiod
+        self._chip = gpiod.Chip(chip)
+        self._line = self._chip.get_line(line)
+        self._line.request(consumer=consumer,
+                           type=gpiod.LINE_REQ_EV_BOTH_EDGES)
+        self.active_high = active_high
+
+    def present(self):
+        return bool(self._line.get_value()) == self.active_high
+
+    def wait(self, present, timeout):
+        deadline = time.monotonic() + timeout
+        while self.present() != present:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            if self._line.event_wait(sec=int(remaining),
+                                     nsec=int((remaining % 1) * 1e9)):
+                self._line.event_read()
+        return True
+
+    def close(self):
+        self._line.release()
+        self._chip.close()
+
+
+class FakePresence:
+    """In-memory presence source for tests and the host-side simulator"""
+
+    def __init__(self, present=False):
+        import threading
+        self._present = present
+        self._cond = threading.Condition()
+
+    def set(self, present):
+        with self._cond:
+            self._present = present
+            self._cond.notify_all()
+
+    def present(self):
+        return self._present
+
+    def wait(self, present, timeout):
+        with self._cond:
+            return self._cond.wait_for(lambda: self._present == present,
+                                       timeout)
+
+    def close(self):
+        pass
@@ -0,0 +1,109 @@
+"""Declarative LED sequences played in the background
+
+A sequence is a list of steps (mode, color, blink_count, hold seconds),
+using the values of ID809.LED_MODES / LED_COLORS; a mode of None keeps
+the current state for the hold. play() returns at once;
+a worker thread sends each step and holds it, so showing a result never
+costs the caller a sleep:
+
+    sched = CommandScheduler(fp)
+    leds = LedPlayer(sched)
+    leds.play(LedPlayer.SUCCESS)                   # green 2 s, then off
+    leds.play([(2, 3, 0, 0.5), (2, 4, 0, 0.5)], loop=True)
+    leds.stop()
+
+A new play() replaces the running sequence at once. Through a
+CommandScheduler the steps go out at LOW priority and coalesce, so they
+never hold up a capture. Repeating a steady state is free: the driver
+skips LED frames that would not change anything (see ID809.ctrl_led).
+"""
+import threading
+
+# Modes
+BREATHING = 1
+FAST_BLINK = 2
+KEEPS_ON = 3
+NORMAL_CLOSE = 4
+FADE_IN = 5
+FADE_OUT = 6
+SLOW_BLINK = 7
+
+# Colors
+GREEN = 1
+RED = 2
+YELLOW = 3
+BLUE = 4
+CYAN = 5
+MAGENTA = 6
+WHITE = 7
+
+
+class LedPlayer:
+    """Plays LED sequences on one sensor from a background thread"""
+
+    IDLE = ((BREATHING, BLUE, 0, 0),)
+    CAPTURE = ((FAST_BLINK, YELLOW, 3, 0),)
+    SUCCESS = ((KEEPS_ON, GREEN, 0, 2.0), (NORMAL_CLOSE, BLUE, 0, 0))
+    FAILURE = ((KEEPS_ON, RED, 0, 2.0), (NORMAL_CLOSE, BLUE, 0, 0))
+    OFF = ((NORMAL_CLOSE, BLUE, 0, 0),)
+
+    def __init__(self, target):
+        """target is a CommandScheduler, or an ID809 nothing else is using"""
+        self.target = target
+        self.errors = 0
+        self._steps = ()
+        self._loop = False
+        self._gen = 0           # bumped by every play()/stop()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='id809-led',
+                                        daemon=True)
+        self._thread.start()
+
+    def play(self, steps, loop=False):
+        """Start steps, replacing whatever is playing"""
+        with self._cond:
+            self._steps = tuple(steps)
+            self._loop = loop
+            self._gen += 1
+            self._cond.notify()
+
+    def stop(self):
+        """Stop after the current step; the LED keeps its last state"""
+        self.play(())
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._gen += 1
+            self._cond.notify()
+        self._thread.join()
+
+    def _run(self):
+        gen = 0
+        while True:
+            with self._cond:
+                while self._gen == gen and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                gen, steps, loop = self._gen, self._steps, self._loop
+            # Looping a sequence without holds would just spin
+            loop = loop and any(step[3] for step in steps)
+            while steps and self._play(gen, steps) and loop:
+                pass
+
+    def _play(self, gen, steps):
+        """Run one pass of steps; False once superseded"""
+        for mode, color, blink_count, hold in steps:
+            try:
+                if mode is not None:
+                    self.target.ctrl_led(mode, color, blink_count)
+            except Exception:  # cosmetic; never take the worker down
+                self.errors += 1
+            with self._cond:
+                if hold:
+                    self._cond.wait_for(lambda: self._gen != gen, hold)
+                if self._gen != gen:
+                    return False
+        return True
@@ -0,0 +1,137 @@
+"""Drive many ID809 modules from one process
+
+Sensors are grouped by the bus they sit on. Each bus gets one worker: an
+event loop (in its own thread where threads exist) running AsyncID809 flows
+for that bus's sensors. Within a bus, I2C transactions never interleave,
+because a transaction contains no await, but the sensors' processing times
+overlap. Separate buses run in parallel.
+
+    mgr = SensorManager()
+    mgr.add('front', 1, 0x1F)
+    mgr.add('lab', 3, 0x1F)
+
+    async def verify(fp):
+        if await fp.collection_fingerprint(10) == 0:
+            return await fp.search()
+        return 0
+
+    mgr.run(verify)          # {'front': 3, 'lab': 0}
+"""
+try:
+    import asyncio
+except ImportError:
+    import uasyncio as asyncio
+
+try:
+    import threading
+except ImportError:  # MicroPython: every bus shares the caller's loop
+    threading = None
+
+from id809_async import AsyncID809
+
+
+class _BusWorker:
+    """One event loop serving every sensor on one bus"""
+
+    def __init__(self, key):
+        self.key = key
+        self.sensors = {}
+        self.loop = None
+        if threading:
+            self.loop = asyncio.new_event_loop()
+            self.thread = threading.Thread(target=self.loop.run_forever,
+                                           name='id809-bus-%s' % (key,),
+                                           daemon=True)
+            self.thread.start()
+
+    async def gather(self, op, names):
+        """Run op(fp) on the named sensors concurrently; {name: result}"""
+        names = [n for n in names if n in self.sensors]
+        results = await asyncio.gather(*[self._one(op, n) for n in names])
+        return dict(zip(names, results))
+
+    async def _one(self, op, name):
+        try:
+            return await op(self.sensors[name])
+        except Exception as e:  # tag the failure, keep the other sensors going
+            return e
+
+    def submit(self, op, names):
+        """Schedule gather() on this worker's thread; a concurrent future"""
+        return asyncio.run_coroutine_threadsafe(self.gather(op, names), self.loop)
+
+    def close(self):
+        if self.loop:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+            self.loop.close()
+        for fp in self.sensors.values():
+            fp.bus.close()
+
+
+class SensorManager:
+    """Owns N sensors across several buses; results come back by sensor name"""
+
+    def __init__(self):
+        self.sensors = {}   # name -> AsyncID809
+        self._workers = {}  # bus key -> _BusWorker
+        self._bus_of = {}   # name -> bus key
+
+    def add(self, name, i2c=1, address=0x1F, bus=None, **kwargs):
+        """Add a sensor
+
+        i2c is anything AsyncID809 accepts. Sensors with the same bus key
+        share a worker; the key defaults to the bus number, or to the
+        i2c/transport object itself.
+        """
+        if name in self.sensors:
+            raise ValueError('duplicate sensor %r' % (name,))
+        if bus is None:
+            bus = i2c if isinstance(i2c, int) else id(i2c)
+        worker = self._workers.get(bus)
+        if worker is None:
+            worker = self._workers[bus] = _BusWorker(bus)
+        fp = AsyncID809(i2c, address, **kwargs)
+        worker.sensors[name] = fp
+        self.sensors[name] = fp
+        self._bus_of[name] = bus
+        return fp
+
+    def _targets(self, names):
+        names = list(self.sensors) if names is None else list(names)
+        for name in names:
+            if name not in self.sensors:
+                raise KeyError(name)
+        return names
+
+    async def gather(self, op, names=None):
+        """Await op(fp) on every (or the named) sensor; {name: result}
+
+        A sensor whose op raised maps to the exception instance.
+        """
+        names = self._targets(names)
+        results = {}
+        if threading:
+            futures = [asyncio.wrap_future(w.submit(op, names))
+                       for w in self._workers.values()]
+        else:
+            futures = [w.gather(op, names) for w in self._workers.values()]
+        for part in await asyncio.gather(*futures):
+            results.update(part)
+        return dict((name, results[name]) for name in names)
+
+    def run(self, op, names=None):
+        """Blocking form of gather() for callers without an event loop"""
+        names = self._targets(names)
+        if not threading:
+            return asyncio.run(self.gather(op, names))
+        results = {}
+        for future in [w.submit(op, names) for w in self._workers.values()]:
+            results.update(future.result())
+        return dict((name, results[name]) for name in names)
+
+    def close(self):
+        for worker in self._workers.values():
+            worker.close()
+        self._workers = {}
+        self.sensors = {}
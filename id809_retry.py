@@ -0,0 +1,210 @@
+"""Retries with jittered backoff and a per-sensor circuit breaker
+
+    fp = Guarded(ID809(1))
+    fp.is_connected()          # retried on bus errors
+    fp.store_fingerprint(5)    # never retried: not idempotent
+
+A call fails transiently when it raises OSError or leaves a bus-level tag
+in _error ("BUS", "REPLY_TIMEOUT", "FRAME", "BUSY"). Only idempotent
+commands are retried, with capped, jittered exponential backoff. The
+module's own answers (no match, bad image) and nobody touching the sensor
+("TIMEOUT" from a finger wait) are results, not failures.
+
+Only bus commands (Guarded.COMMANDS) are guarded. Host-side helpers such
+as within(), hot_slots() or set_group(), index lookups once the slot index
+is loaded and a flush() with nothing pending pass straight through: they
+neither count towards nor reset the breaker.
+
+After `threshold` failed calls in a row the breaker opens. Calls then raise
+CircuitOpen without touching the bus, while is_connected() is probed every
+`probe_s` from a background thread (without threads: by the first call
+once `probe_s` has passed). The first good probe closes the breaker.
+"""
+try:
+    import random
+except ImportError:
+    import urandom as random
+
+try:
+    import threading
+except ImportError:  # MicroPython without _thread
+    threading = None
+
+from id809 import sleep_ms, ticks_ms, ticks_diff
+
+
+class CircuitOpen(OSError):
+    """The sensor is marked unhealthy; the call was not attempted"""
+
+
+class RetryPolicy:
+    """How often and how patiently a transient failure is retried"""
+
+    # Commands that leave the module as they found it when repeated
+    IDEMPOTENT = ('begin', 'get_device_info', 'is_connected', 'ctrl_led',
+                  'detect_finger', 'search', 'cascade_search', 'verify',
+                  'get_empty_id',
+                  'flush', 'del_fingerprint', 'load_slots', 'enrolled_ids',
+                  'is_enrolled', 'enrolled_count', 'upload_template',
+                  'download_template', '_get_image', '_generate')
+
+    def __init__(self, attempts=3, base_ms=10, cap_ms=250, jitter=0.5,
+                 idempotent=None):
+        self.attempts = attempts  # tries in total, including the first
+        self.base_ms = base_ms
+        self.cap_ms = cap_ms
+        self.jitter = jitter      # share of each delay that is randomised
+        self.idempotent = self.IDEMPOTENT if idempotent is None else idempotent
+
+    def retries(self, name):
+        """Extra attempts allowed for a command"""
+        return self.attempts - 1 if name in self.idempotent else 0
+
+    def delay_ms(self, attempt):
+        """Backoff before retry number attempt (0 for the first retry)"""
+        delay = min(self.cap_ms, self.base_ms << attempt)
+        spread = int(delay * self.jitter)
+        if spread:
+            delay -= random.getrandbits(16) * spread >> 16
+        return delay
+
+
+class CircuitBreaker:
+    """Closed -> open after threshold failures -> closed after a good probe"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+
+    def __init__(self, threshold=5, probe_s=2.0):
+        self.threshold = threshold
+        self.probe_s = probe_s
+        self.state = self.CLOSED
+        self.failures = 0        # consecutive failed calls
+        self.rejected = 0        # calls failed fast while open
+        self.opened_at = 0
+
+    def allow(self, probing=False):
+        """Whether a call may use the bus now"""
+        if self.state == self.CLOSED:
+            return True
+        # Without a probe thread the first call after probe_s is the probe
+        return (not probing and
+                ticks_diff(ticks_ms(), self.opened_at) >= self.probe_s * 1000)
+
+    def record(self, ok):
+        """Account for one finished call; True if the breaker just opened"""
+        if ok:
+            self.failures = 0
+            self.state = self.CLOSED
+            return False
+        self.failures += 1
+        if self.state == self.OPEN or self.failures >= self.threshold:
+            opened = self.state == self.CLOSED
+            self.state = self.OPEN
+            self.opened_at = ticks_ms()
+            return opened
+        return False
+
+
+class Guarded:
+    """An ID809 whose commands go through a RetryPolicy and CircuitBreaker
+
+    Attribute access is passed through, so a Guarded can stand in for the
+    driver, e.g. in front of a CommandScheduler.
+    """
+
+    TRANSIENT = ("BUS", "REPLY_TIMEOUT", "FRAME", "BUSY")
+
+    # Driver methods that use the bus; anything else is passed through
+    COMMANDS = ('begin', 'get_device_info', 'is_connected', 'ctrl_led',
+                'flush', 'detect_finger', 'wait_finger',
+                'collection_fingerprint', 'store_fingerprint',
+                'del_fingerprint', 'upload_template', 'download_template',
+                'relayout', 'search', 'cascade_search', 'verify', 'identify',
+                'load_slots', 'enrolled_ids', 'is_enrolled', 'enrolled_count',
+                'get_empty_id', '_get_image', '_generate', '_merge')
+
+    # Answered from the slot index, without the bus, once it is loaded
+    INDEXED = ('enrolled_ids', 'is_enrolled', 'enrolled_count',
+               'get_empty_id')
+
+    def __init__(self, fp, policy=None, breaker=None):
+        self.fp = fp
+        self.policy = policy or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        self.retried = 0
+        self._prober = None
+        self._closed = False
+
+    def __getattr__(self, name):
+        attr = getattr(self.fp, name)
+        if name not in self.COMMANDS:
+            return attr
+        return lambda *args, **kwargs: self.call(name, *args, **kwargs)
+
+    def call(self, name, *args, **kwargs):
+        """Run fp.name(*args) under the retry policy and the breaker"""
+        fp = self.fp
+        if not self._uses_bus(name):
+            return getattr(fp, name)(*args, **kwargs)
+        breaker = self.breaker
+        if not breaker.allow(self._prober is not None):
+            breaker.rejected += 1
+            raise CircuitOpen('sensor at 0x%02X unavailable' % fp.addr)
+
+        fn = getattr(fp, name)
+        retries = self.policy.retries(name)
+        attempt = 0
+        while True:
+            fp._error = fp.ERR_SUCCESS
+            try:
+                result = fn(*args, **kwargs)
+                error = None
+            except OSError as e:
+                result = None
+                error = e
+            failed = error is not None or fp._error in self.TRANSIENT
+            if not failed or attempt >= retries or fp._stop():
+                break
+            sleep_ms(fp._left(self.policy.delay_ms(attempt)))
+            attempt += 1
+            self.retried += 1
+
+        if breaker.record(not failed):
+            self._start_probe()
+        if error is not None:
+            raise error
+        return result
+
+    def _uses_bus(self, name):
+        """Whether calling fp.name now would touch the bus"""
+        fp = self.fp
+        if name not in self.COMMANDS:
+            return False
+        if name == 'flush':
+            return bool(fp._deferred)
+        return name not in self.INDEXED or fp._slots is None
+
+    def _start_probe(self):
+        if threading is None or self._closed:
+            return
+        self._prober = threading.Thread(target=self._probe_loop,
+                                        name='id809-probe', daemon=True)
+        self._prober.start()
+
+    def _probe_loop(self):
+        """Background health check while the breaker is open"""
+        breaker = self.breaker
+        while not self._closed and breaker.state == breaker.OPEN:
+            sleep_ms(int(breaker.probe_s * 1000))
+            try:
+                ok = self.fp.is_connected()
+            except OSError:
+                ok = False
+            if ok:
+                breaker.record(True)
+        self._prober = None
+
+    def close(self):
+        """Stop the background probe"""
+        self._closed = True
@@ -0,0 +1,200 @@
+"""Per-sensor command queue with priorities and LED coalescing
+
+One worker thread owns the driver; callers queue commands and get a ticket
+back. Capture, search and store run before anything cosmetic, and a newer
+LED state replaces one still waiting in the queue, so the identification
+path never sits behind LED traffic:
+
+    sched = CommandScheduler(fp)
+    sched.ctrl_led(1, 4, 0)                  # LOW, may be superseded
+    match = sched.search().wait()            # HIGH
+    sched.ctrl_led(3, 1, 0)
+
+A command that is already running is never interrupted, so a HIGH command
+waits at most for one in-flight LED frame.
+
+Read-only status queries (detect_finger, is_connected) are single-flight:
+callers asking while one is queued or running get the same ticket, and a
+result stays valid for ttl seconds, so a UI thread, a verify worker and a
+health monitor polling together cost one transaction.
+"""
+import heapq
+import threading
+import time
+
+
+class Ticket:
+    """Result of one queued command"""
+
+    def __init__(self, name):
+        self.name = name
+        self.result = None
+        self.error = None
+        self.superseded = False
+        self._done = threading.Event()
+
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """Block until the command ran and return its result
+
+        Re-raises the command's exception. A superseded LED command returns
+        None without having been sent.
+        """
+        if not self._done.wait(timeout):
+            raise TimeoutError(self.name)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+    def _finish(self, result=None, error=None):
+        self.result = result
+        self.error = error
+        self._done.set()
+
+
+class CommandScheduler:
+    """Priority queue in front of one ID809"""
+
+    HIGH = 0
+    NORMAL = 1
+    LOW = 2
+
+    PRIORITY = {
+        'collection_fingerprint': HIGH,
+        'detect_finger': HIGH,
+        'search': HIGH,
+        'cascade_search': HIGH,
+        'verify': HIGH,
+        'identify': HIGH,
+        'store_fingerprint': HIGH,
+        '_get_image': HIGH,
+        '_generate': HIGH,
+        '_merge': HIGH,
+        'ctrl_led': LOW,
+    }
+
+    # Commands where only the latest queued call matters
+    COALESCE = {'ctrl_led': 'led'}
+
+    # Read-only queries whose concurrent callers share one transaction
+    SHARED = ('detect_finger', 'is_connected')
+
+    def __init__(self, fp, ttl=0.05):
+        self.fp = fp
+        self.ttl = ttl       # seconds a shared query's result is reused
+        self.coalesced = 0
+        self.shared = 0      # calls answered by another caller's transaction
+        self._inflight = {}  # shared query name -> ticket
+        self._cache = {}     # shared query name -> (monotonic time, result)
+        self._queue = []     # heap of [priority, seq, ticket, fn, args, kwargs]
+        self._pending = {}   # coalescing key -> queued entry
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='id809-sched',
+                                        daemon=True)
+        self._thread.start()
+
+    def submit(self, fn, *args, priority=NORMAL, key=None, name=None,
+               **kwargs):
+        """Queue fn(*args, **kwargs), superseding a queued entry with key"""
+        ticket = Ticket(name or getattr(fn, '__name__', 'command'))
+        with self._cond:
+            if self._closed:
+                raise RuntimeError('scheduler closed')
+            if key is not None:
+                old = self._pending.get(key)
+                if old is not None:
+                    old[3] = None  # skipped by the worker
+                    old[2].superseded = True
+                    old[2]._finish()
+                    self.coalesced += 1
+            entry = [priority, self._seq, ticket, fn, args, kwargs]
+            self._seq += 1
+            if key is not None:
+                self._pending[key] = entry
+                entry.append(key)
+            heapq.heappush(self._queue, entry)
+            self._cond.notify()
+        return ticket
+
+    def call(self, name, *args, **kwargs):
+        """Queue fp.name(*args, **kwargs) with the command's default priority"""
+        if name in self.SHARED and not args and not kwargs:
+            return self._shared(name)
+        return self.submit(getattr(self.fp, name), *args,
+                           priority=self.PRIORITY.get(name, self.NORMAL),
+                           key=self.COALESCE.get(name), name=name, **kwargs)
+
+    def _shared(self, name):
+        """Ticket for a shared query: cached, in flight, or newly queued"""
+        with self._cond:
+            hit = self._cache.get(name)
+            if hit is not None and time.monotonic() - hit[0] < self.ttl:
+                self.shared += 1
+                ticket = Ticket(name)
+                ticket._finish(hit[1])
+                return ticket
+            ticket = self._inflight.get(name)
+            if ticket is not None:
+                self.shared += 1
+                return ticket
+            ticket = self.submit(self._run_shared, name,
+                                 priority=self.PRIORITY.get(name, self.NORMAL),
+                                 name=name)
+            self._inflight[name] = ticket
+            return ticket
+
+    def _run_shared(self, name):
+        try:
+            result = getattr(self.fp, name)()
+        except Exception:
+            with self._cond:
+                self._inflight.pop(name, None)
+            raise
+        with self._cond:
+            self._cache[name] = (time.monotonic(), result)
+            self._inflight.pop(name, None)
+        return result
+
+    def __getattr__(self, name):
+        if name.startswith('__') or not hasattr(self.fp, name):
+            raise AttributeError(name)
+        return lambda *args, **kwargs: self.call(name, *args, **kwargs)
+
+    def _run(self):
+        flush = getattr(self.fp, 'flush', None)
+        while True:
+            with self._cond:
+                idle = not self._queue
+            if idle and flush:
+                # Collect any fire-and-forget acknowledgement while idle
+                try:
+                    flush()
+                except Exception:
+                    pass
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                entry = heapq.heappop(self._queue)
+                if len(entry) > 6 and self._pending.get(entry[6]) is entry:
+                    del self._pending[entry[6]]
+            ticket, fn, args, kwargs = entry[2], entry[3], entry[4], entry[5]
+            if fn is None:
+                continue
+            try:
+                ticket._finish(fn(*args, **kwargs))
+            except Exception as e:
+                ticket._finish(error=e)
+
+    def close(self, wait=True):
+        """Stop accepting commands; the worker drains what is queued"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if wait:
+            self._thread.join()
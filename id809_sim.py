@@ -0,0 +1,324 @@
+"""In-process ID809 simulator, usable anywhere a transport is
+
+    sim = ID809Sim(capacity=80)
+    fp = ID809(sim)
+    sim.place('alice')            # finger down
+    fp.collection_fingerprint(1)
+    sim.remove()
+
+Command frames (0xAA55) are decoded and checksum-checked, and answered with
+0x55AA response frames after a per-command processing delay. Reads return
+the BUSY byte until the response is ready. A finger is any hashable token:
+its feature is the token itself, so templates match when the tokens do.
+Uploaded templates are TEMPLATE_SIZE bytes standing for the token, and
+download back to it.
+"""
+import random
+import struct
+import time
+
+
+class ID809Sim:
+    """Protocol-level model of one ID809 module on an I2C bus"""
+
+    MAX_TRANSFER = None
+    COMBINED = True
+    READINTO = True
+
+    BUSY = 0xEE
+    RAM_BUFFERS = 3
+    TEMPLATE_SIZE = 498
+
+    # Module result codes
+    ERR_SUCCESS = 0x00
+    ERR_FAIL = 0x01
+    ERR_VERIFY = 0x10
+    ERR_IDENTIFY = 0x11
+    ERR_TMPL_EMPTY = 0x12
+    ERR_TMPL_NOT_EMPTY = 0x13
+    ERR_EMPTY_ID_NOEXIST = 0x15
+    ERR_BAD_QUALITY = 0x19
+    ERR_MERGE_FAIL = 0x1A
+    ERR_INVALID_TMPL_NO = 0x1D
+    ERR_INVALID_PARAM = 0x22
+    ERR_INVALID_BUFFER_ID = 0x26
+    ERR_FP_NOT_DETECTED = 0x28
+    ERR_CHECKSUM = 0x30
+
+    # Processing time per command (s); search adds SEARCH_PER_SLOT per slot
+    DELAYS = {
+        0x0001: 0.005,  # test connection
+        0x0004: 0.005,  # device info
+        0x0020: 0.150,  # get image
+        0x0021: 0.030,  # finger detect
+        0x0024: 0.005,  # LED control
+        0x0040: 0.080,  # store
+        0x0041: 0.020,  # load template
+        0x0042: 0.010,  # upload template
+        0x0043: 0.010,  # download template
+        0x0044: 0.040,  # delete
+        0x0045: 0.020,  # get empty id
+        0x0049: 0.010,  # enrolled id list
+        0x0060: 0.120,  # generate
+        0x0061: 0.100,  # merge
+        0x0063: 0.020,  # search
+        0x0064: 0.020,  # verify
+    }
+    SEARCH_PER_SLOT = 0.001
+
+    def __init__(self, capacity=80, delays=None, scale=1.0, error_rate=0.0,
+                 seed=None, address=0x1F):
+        self.capacity = capacity
+        self.delays = dict(self.DELAYS)
+        if delays:
+            self.delays.update(delays)
+        self.scale = scale            # 0 answers instantly
+        self.error_rate = error_rate  # chance of OSError per transfer
+        self.fail_next = 0            # transfers that fail unconditionally
+        self.bad_images = 0           # next captures rejected as bad quality
+        self.address = address
+        self.templates = {}           # slot -> feature
+        self.ram = [None] * self.RAM_BUFFERS
+        self.finger = None
+        self.image = None
+        self.led = None               # last LED payload as a tuple
+        self.commands = []            # cmd of every frame received
+        self._presence = None
+        self._rng = random.Random(seed)
+        self._out = b''
+        self._ready = 0
+        self._follow = None           # data packet to send after a response
+        self._download = None         # data packet size announced by 0x0043
+        self._blobs = {}              # uploaded template bytes -> feature
+
+    # Test-side controls
+
+    def place(self, finger):
+        """Put a finger (any hashable token) on the sensor"""
+        self.finger = finger
+        if self._presence:
+            self._presence.set(True)
+
+    def remove(self):
+        self.finger = None
+        if self._presence:
+            self._presence.set(False)
+
+    @property
+    def presence(self):
+        """FakePresence tracking place()/remove(), like the IRQ line"""
+        if self._presence is None:
+            from id809_irq import FakePresence
+            self._presence = FakePresence(self.finger is not None)
+        return self._presence
+
+    def enroll(self, slot, finger):
+        """Store a template directly, bypassing the capture flow"""
+        self.templates[slot] = finger
+
+    # Transport interface
+
+    def write(self, buf):
+        self._fault()
+        frame = bytes(buf)
+        if len(frame) < 10 or frame[:2] not in (b'\xaa\x55', b'\xa5\x5a'):
+            return
+        cmd, length = struct.unpack_from('>HH', frame, 4)
+        data = frame[8:8 + length]
+        cks = struct.unpack_from('>H', frame, 8 + length)[0]
+        self.commands.append(cmd)
+        self._follow = None
+        if cks != (0xFF + sum(frame[2:8 + length])) & 0xFFFF:
+            ret, out, delay = self.ERR_CHECKSUM, b'', 0
+        elif frame[0] == 0xA5:
+            ret, out = self._receive(cmd, data)
+            delay = self.delays.get(cmd, 0.005)
+        else:
+            ret, out = self._execute(cmd, data)
+            delay = self.delays.get(cmd, 0.005)
+            if cmd == 0x0063 and ret != self.ERR_INVALID_PARAM:
+                slots = self._word(data, 4) - self._word(data, 2) + 1
+                delay += self.SEARCH_PER_SLOT * slots
+            elif cmd == 0x0064:
+                delay += self.SEARCH_PER_SLOT
+        self._out = self._frame(cmd, ret, out)
+        if self._follow is not None:
+            # The bitmap or template itself follows as a data packet
+            self._out += self._frame(cmd, ret, self._follow, 0x5AA5)
+        self._ready = time.monotonic() + delay * self.scale
+
+    def readinto(self, buf):
+        self._fault()
+        n = len(buf)
+        if time.monotonic() < self._ready or not self._out:
+            for i in range(n):
+                buf[i] = self.BUSY
+            return
+        chunk = self._out[:n]
+        buf[:len(chunk)] = chunk
+        for i in range(len(chunk), n):
+            buf[i] = self.BUSY
+        self._out = self._out[n:]
+
+    def write_read(self, wbuf, rbuf):
+        self.write(wbuf)
+        self.readinto(rbuf)
+
+    def close(self):
+        pass
+
+    # Model
+
+    def _fault(self):
+        if self.fail_next:
+            self.fail_next -= 1
+            raise OSError(5, 'simulated bus error')
+        if self.error_rate and self._rng.random() < self.error_rate:
+            raise OSError(5, 'simulated bus error')
+
+    def _frame(self, rcm, ret, data, prefix=0x55AA):
+        frame = bytearray(struct.pack('>HBBHHH', prefix, 0, 0, rcm, len(data) + 2, ret))
+        frame += data
+        frame += struct.pack('>H', (0xFF + sum(frame[2:])) & 0xFFFF)
+        return bytes(frame)
+
+    def _word(self, data, offset):
+        if len(data) < offset + 2:
+            return 0
+        return struct.unpack_from('<H', data, offset)[0]
+
+    def _bitmap(self):
+        """Enrolled slots as a bitmap, bit n of the list = slot n"""
+        bits = bytearray((self.capacity >> 3) + 1)
+        for slot in self.templates:
+            bits[slot >> 3] |= 1 << (slot & 7)
+        return bytes(bits)
+
+    def _blob(self, feature):
+        """Upload form of a feature: TEMPLATE_SIZE bytes"""
+        blob = repr(feature).encode()[:self.TEMPLATE_SIZE]
+        blob += bytes(self.TEMPLATE_SIZE - len(blob))
+        self._blobs[blob] = feature
+        return blob
+
+    def _receive(self, cmd, data):
+        """Return (RET, response data) for a command data packet"""
+        size, self._download = self._download, None
+        if cmd != 0x0043 or size is None:
+            return self.ERR_INVALID_PARAM, b''
+        ram = self._word(data, 0)
+        if len(data) != size or ram >= self.RAM_BUFFERS:
+            return self.ERR_INVALID_PARAM, b''
+        blob = bytes(data[2:])
+        self.ram[ram] = self._blobs.get(blob, blob)
+        return self.ERR_SUCCESS, b''
+
+    def _slot_ok(self, slot):
+        return 1 <= slot <= self.capacity
+
+    def _execute(self, cmd, data):
+        """Return (RET, response data) for one command"""
+        ok = self.ERR_SUCCESS
+        if cmd == 0x0001:
+            return ok, b''
+        if cmd == 0x0004:
+            return ok, b'ID809_V1.4' if self.capacity == 80 else b'ID809_V1.3'
+        if cmd == 0x0021:
+            return ok, struct.pack('<H', self.finger is not None)
+        if cmd == 0x0024:
+            self.led = tuple(data[:4])
+            return ok, b''
+        if cmd == 0x0020:
+            if self.finger is None:
+                return self.ERR_FP_NOT_DETECTED, b''
+            if self.bad_images:
+                self.bad_images -= 1
+                self.image = None
+                return self.ERR_BAD_QUALITY, b''
+            self.image = self.finger
+            return ok, b''
+        if cmd == 0x0060:
+            ram = self._word(data, 0)
+            if ram >= self.RAM_BUFFERS:
+                return self.ERR_INVALID_BUFFER_ID, b''
+            if self.image is None:
+                return self.ERR_FAIL, b''
+            self.ram[ram] = self.image
+            return ok, b''
+        if cmd == 0x0061:
+            count = data[2] if len(data) > 2 else 0
+            if not 1 <= count <= self.RAM_BUFFERS:
+                return self.ERR_INVALID_PARAM, b''
+            features = self.ram[:count]
+            if features[0] is None or any(f != features[0] for f in features):
+                return self.ERR_MERGE_FAIL, b''
+            self.ram[0] = features[0]
+            return ok, b''
+        if cmd == 0x0040:
+            slot, ram = self._word(data, 0), self._word(data, 2)
+            if not self._slot_ok(slot):
+                return self.ERR_INVALID_TMPL_NO, b''
+            if ram >= self.RAM_BUFFERS or self.ram[ram] is None:
+                return self.ERR_INVALID_BUFFER_ID, b''
+            self.templates[slot] = self.ram[ram]
+            return ok, b''
+        if cmd == 0x0044:
+            start, end = self._word(data, 0), self._word(data, 2)
+            if not (self._slot_ok(start) and self._slot_ok(end)) or start > end:
+                return self.ERR_INVALID_PARAM, b''
+            for slot in range(start, end + 1):
+                self.templates.pop(slot, None)
+            return ok, b''
+        if cmd == 0x0045:
+            start, end = self._word(data, 0), self._word(data, 2)
+            if not (self._slot_ok(start) and self._slot_ok(end)) or start > end:
+                return self.ERR_INVALID_PARAM, b''
+            for slot in range(start, end + 1):
+                if slot not in self.templates:
+                    return ok, struct.pack('<H', slot)
+            return self.ERR_EMPTY_ID_NOEXIST, b''
+        if cmd == 0x0049:
+            self._follow = self._bitmap()
+            return ok, struct.pack('<H', len(self._follow))
+        if cmd == 0x0041:
+            slot, ram = self._word(data, 0), self._word(data, 2)
+            if not self._slot_ok(slot):
+                return self.ERR_INVALID_TMPL_NO, b''
+            if ram >= self.RAM_BUFFERS:
+                return self.ERR_INVALID_BUFFER_ID, b''
+            if slot not in self.templates:
+                return self.ERR_TMPL_EMPTY, b''
+            self.ram[ram] = self.templates[slot]
+            return ok, b''
+        if cmd == 0x0042:
+            ram = self._word(data, 0)
+            if ram >= self.RAM_BUFFERS or self.ram[ram] is None:
+                return self.ERR_INVALID_BUFFER_ID, b''
+            self._follow = self._blob(self.ram[ram])
+            return ok, struct.pack('<H', len(self._follow))
+        if cmd == 0x0043:
+            # Next comes a data packet: RAM buffer ID and the template
+            self._download = self._word(data, 0)
+            return ok, b''
+        if cmd == 0x0063:
+            ram, start, end = struct.unpack_from('<HHH', data + bytes(6), 0)
+            if not (self._slot_ok(start) and self._slot_ok(end)) or start > end:
+                return self.ERR_INVALID_PARAM, b''
+            feature = self.ram[ram] if ram < self.RAM_BUFFERS else None
+            if feature is not None:
+                for slot in range(start, end + 1):
+                    if self.templates.get(slot) == feature:
+                        return ok, struct.pack('<H', slot)
+            return self.ERR_IDENTIFY, b''
+        if cmd == 0x0064:
+            slot, ram = self._word(data, 0), self._word(data, 2)
+            if not self._slot_ok(slot):
+                return self.ERR_INVALID_TMPL_NO, b''
+            if ram >= self.RAM_BUFFERS or self.ram[ram] is None:
+                return self.ERR_INVALID_BUFFER_ID, b''
+            if slot not in self.templates:
+                return self.ERR_TMPL_EMPTY, b''
+            if self.templates[slot] != self.ram[ram]:
+                return self.ERR_VERIFY, b''
+            return ok, struct.pack('<H', slot)
+        return self.ERR_INVALID_PARAM, b''
@@ -0,0 +1,313 @@
+"""Step-driven enroll and verify for super-loops without asyncio
+
+A job never sleeps and does at most one bus transaction per step(): a
+command frame, a busy probe, or reading a response. step() returns how
+many ms may pass before the job wants the next call, or None once it has
+finished:
+
+    job = VerifyJob(fp, timeout=10)
+    while not job.done:
+        due = job.step()
+        keypad.scan()
+        relays.update()
+    if job.result:
+        unlock()
+
+job.state names the stage in progress ('place', 'capture', 'generate',
+'search', 'remove', 'merge', 'store', then 'done'), handy for driving an
+LED or a display from the loop. On failure job.result is 0 (verify) or
+ERR_ID809 (enroll) and fp._error says why.
+
+Pass deadline=Deadline(ms) to bound a job end to end, or call
+job.cancel() to abandon it: the bus is free for other commands at once,
+and a reply still owed by the module is drained before the next one.
+cancel() may come from another thread; if a step() is running there, the
+job's own thread finishes the cancel.
+"""
+import struct
+
+try:
+    from _thread import allocate_lock
+except ImportError:  # no threads: cancel() can only come between steps
+    allocate_lock = None
+
+from id809 import sleep_ms, ticks_ms, ticks_diff
+
+
+class _Job:
+    """Command engine shared by the jobs; subclasses write _flow()"""
+
+    def __init__(self, fp, timeout, deadline=None):
+        self.fp = fp
+        self.timeout = timeout
+        self.deadline = deadline
+        self.state = None
+        self.result = None
+        self.done = False
+        self._ret = fp.ERR_SUCCESS
+        self._flow_gen = None
+        self._pending = None  # (cmd, sent ticks) awaiting its response
+        self._cancelled = False
+        # Held by step(); keeps cancel() from another thread off the flow
+        self._lock = allocate_lock() if allocate_lock else None
+
+    def step(self):
+        """Advance by at most one bus transaction; ms until due, or None"""
+        if self.done:
+            return None
+        lock = self._lock
+        if lock:
+            lock.acquire()
+        try:
+            return self._step()
+        finally:
+            if lock:
+                lock.release()
+
+    def cancel(self):
+        """Abandon the job; result keeps its failure value
+
+        Only sets a flag if a step() is running on another thread; that
+        step, or the next one, tears the job down.
+        """
+        self._cancelled = True
+        lock = self._lock
+        if lock and not lock.acquire(0):
+            return
+        try:
+            if not self.done:
+                self._teardown("CANCELLED")
+        finally:
+            if lock:
+                lock.release()
+
+    def _step(self):
+        if self.done:
+            return None
+        stop = "CANCELLED" if self._cancelled else (
+            self.deadline and self.deadline.stop())
+        if stop:
+            self._teardown(stop)
+            return None
+        if self._flow_gen is None:
+            self._flow_gen = self._flow()
+        try:
+            due = next(self._flow_gen)
+        except StopIteration:
+            self.state = 'done'
+            self.done = True
+            return None
+        if self._cancelled:  # cancel() came in during this step
+            self._teardown("CANCELLED")
+            return None
+        return due
+
+    def _teardown(self, error):
+        """End the flow; a reply still owed is left for the driver to drain"""
+        if self._flow_gen is not None:
+            self._flow_gen.close()
+        if self._pending:
+            fp = self.fp
+            fp._deferred, fp._deferred_at = self._pending
+            fp._deferred_led = None
+            self._pending = None
+        self.fp._error = error
+        self.state = 'done'
+        self.done = True
+
+    def run(self):
+        """Blocking convenience: step until done, sleeping as advised"""
+        while True:
+            due = self.step()
+            if due is None:
+                return self.result
+            if due:
+                sleep_ms(due)
+
+    def _command(self, cmd, data=None, length=0, slots=0):
+        """Send cmd and collect its response; RET ends up in self._ret"""
+        fp = self.fp
+        if fp._deferred:
+            # A fire-and-forget LED ack is still unread; drain it first
+            pending, start = fp._deferred, fp._deferred_at
+            fp._deferred = 0
+            # Owed by the job now; a teardown mid-drain hands it back
+            self._pending = (pending, start)
+            yield from self._response(pending, start)
+            fp._deferred_done(pending, self._ret)
+        fp._send_packet(fp._pack(fp.CMD_TYPE, cmd, data, length))
+        start = ticks_ms()
+        self._pending = (cmd, start)
+        if fp.poll and not fp._probed:
+            # No probe rode along with the write; the next step takes it
+            yield fp.POLL_MIN_MS
+        yield from self._response(cmd, start, slots)
+        self._pending = None
+
+    def _response(self, cmd, start, slots=0):
+        """Wait for cmd's response one probe per step, then read it"""
+        fp = self.fp
+        delay = fp.CMD_DELAY[cmd]
+        first = None
+        if not fp.poll:
+            left = delay - ticks_diff(ticks_ms(), start)
+            if left > 0:
+                yield left
+            # Header in this step, the rest of the frame in the next
+            try:
+                fp._read(fp._rxv[0:fp.RCM_PROBE])
+            except OSError:
+                fp._error = "BUS"
+                self._ret = fp.ERR_ID809
+                return
+            first = fp._rx[0]
+            yield 0
+        else:
+            wait = fp.POLL_MIN_MS
+            aim = fp._aim(cmd, slots)
+            busy = None
+            while True:
+                first = fp._probe()
+                elapsed = ticks_diff(ticks_ms(), start)
+                if first is not None:
+                    fp._completed(cmd, elapsed, busy, slots)
+                    break
+                if elapsed >= delay * fp.POLL_DEADLINE:
+                    fp._error = "REPLY_TIMEOUT"
+                    self._ret = fp.ERR_ID809
+                    return
+                if elapsed < aim:
+                    yield aim - elapsed
+                    continue
+                busy = elapsed
+                wait = min(wait * 2, fp.POLL_MAX_MS)
+                yield wait
+            yield 0
+        self._ret = fp._response_payload(first)
+        self._pending = None
+        yield 0
+
+    def _wait_finger(self, present):
+        """Wait for placement or removal like ID809.wait_finger"""
+        fp = self.fp
+        start = ticks_ms()
+        seen = 0
+        wait = 0
+        while True:
+            if fp.presence:
+                if fp.presence.present() == present:
+                    return True
+                wait = 10
+            else:
+                yield from self._command(0x0021)
+                found = self._ret == fp.ERR_SUCCESS and fp._buf[0]
+                if bool(found) == present:
+                    seen += 1
+                    fp._activity = ticks_ms()
+                    if seen >= fp.presence_profile['confirm']:
+                        return True
+                else:
+                    seen = 0
+                wait = fp._presence_interval(wait)
+            if ticks_diff(ticks_ms(), start) > self.timeout * 1000:
+                fp._error = "TIMEOUT"
+                return False
+            yield wait
+
+    def _capture(self, ram_id, retries):
+        """Capture and generate into ram_id, recapturing a rejected image"""
+        fp = self.fp
+        data = bytearray(2)
+        data[0] = ram_id
+        for _ in range(retries + 1):
+            self.state = 'capture'
+            yield from self._command(0x0020)
+            if self._ret == fp.ERR_SUCCESS:
+                self.state = 'generate'
+                yield from self._command(0x0060, data, 2)
+                if self._ret == fp.ERR_SUCCESS:
+                    return True
+        return False
+
+
+class VerifyJob(_Job):
+    """Wait for a finger and search for it; result is the match ID or 0"""
+
+    def __init__(self, fp, timeout=10, retries=2, deadline=None, slots=None,
+                 cascade=False):
+        super().__init__(fp, timeout, deadline)
+        self.retries = retries
+        self.slots = slots  # as for ID809.search
+        self.cascade = cascade  # hot slots first, as ID809.cascade_search
+
+    def _flow(self):
+        fp = self.fp
+        self.result = 0
+        self.state = 'place'
+        if not (yield from self._wait_finger(True)):
+            return
+        if not (yield from self._capture(0, self.retries)):
+            return
+        self.state = 'search'
+        if self.cascade:
+            tiers = fp._tiers(self.slots)
+        else:
+            tiers = ([], fp._ranges(self.slots))
+        data = bytearray(6)
+        for tier, ranges in enumerate(tiers):
+            for start, end in ranges:
+                struct.pack_into('<HHH', data, 0, 0, start, end)
+                yield from self._command(0x0063, data, 6, end - start + 1)
+                if self._ret == fp.ERR_SUCCESS:
+                    self.result = fp._buf[0]
+                    fp._matched(self.result)
+                    if not tier:
+                        fp.hot_hits += 1
+                    return
+                if self._ret == fp.ERR_ID809:
+                    return
+
+
+class EnrollJob(_Job):
+    """Capture a finger `captures` times and store it in slot
+
+    result is ERR_SUCCESS once stored, ERR_ID809 otherwise.
+    """
+
+    def __init__(self, fp, slot, captures=3, timeout=10, retries=2,
+                 deadline=None):
+        super().__init__(fp, timeout, deadline)
+        self.slot = slot
+        self.captures = captures
+        self.retries = retries
+
+    def _flow(self):
+        fp = self.fp
+        self.result = fp.ERR_ID809
+        if not 1 <= self.captures <= 3:
+            fp._error = "GATHER_OUT"
+            return
+        for i in range(self.captures):
+            if i:
+                self.state = 'remove'
+                if not (yield from self._wait_finger(False)):
+                    return
+            self.state = 'place'
+            if not (yield from self._wait_finger(True)):
+                return
+            if not (yield from self._capture(i, self.retries)):
+                return
+
+        self.state = 'merge'
+        data = bytearray(3)
+        data[2] = self.captures
+        yield from self._command(0x0061, data, 3)
+        if self._ret != fp.ERR_SUCCESS:
+            return
+        self.state = 'store'
+        data = bytearray(4)
+        data[0] = self.slot
+        yield from self._command(0x0040, data, 4)
+        if self._ret == fp.ERR_SUCCESS:
+            fp._mark(self.slot, True)
+            self.result = fp.ERR_SUCCESS
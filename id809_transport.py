@@ -0,0 +1,194 @@
+"""I2C transports for the ID809 protocol core
+
+A transport is bound to one device address and moves raw bytes:
+
+    write(buf)       send one frame (or chunk) in a single transaction
+    readinto(buf)    fill buf with the next len(buf) bytes from the device
+    close()
+
+Each backend declares what it can do so the core can pick the cheapest path:
+
+    MAX_TRANSFER     largest single transfer in bytes, None if unlimited
+    COMBINED         write_read(wbuf, rbuf) sends and reads back in one
+                     transaction (repeated start, one kernel round trip)
+    READINTO         reads land in the caller's buffer without a copy
+"""
+import os
+
+
+class MachineI2C:
+    """MicroPython machine.I2C / SoftI2C"""
+
+    MAX_TRANSFER = None
+    COMBINED = False
+    READINTO = True
+
+    def __init__(self, i2c, address=0x1F):
+        self.i2c = i2c
+        self.address = address
+
+    def write(self, buf):
+        self.i2c.writeto(self.address, buf)
+
+    def readinto(self, buf):
+        self.i2c.readfrom_into(self.address, buf)
+
+    def close(self):
+        pass
+
+
+class SMBus2I2C:
+    """smbus2 using plain I2C messages (no SMBus register byte, no 32-byte cap)"""
+
+    MAX_TRANSFER = None
+    COMBINED = True
+    READINTO = False
+
+    def __init__(self, bus=1, address=0x1F):
+        from smbus2 import SMBus, i2c_msg
+        self._msg = i2c_msg
+        self.bus = SMBus(bus) if isinstance(bus, int) else bus
+        self.address = address
+
+    def write(self, buf):
+        self.bus.i2c_rdwr(self._msg.write(self.address, bytes(buf)))
+
+    def readinto(self, buf):
+        msg = self._msg.read(self.address, len(buf))
+        self.bus.i2c_rdwr(msg)
+        buf[:] = msg.buf[:len(buf)]
+
+    def write_read(self, wbuf, rbuf):
+        msg = self._msg.read(self.address, len(rbuf))
+        self.bus.i2c_rdwr(self._msg.write(self.address, bytes(wbuf)), msg)
+        rbuf[:] = msg.buf[:len(rbuf)]
+
+    def close(self):
+        self.bus.close()
+
+
+class DevI2C:
+    """Raw Linux /dev/i2c-N character device
+
+    Plain reads and writes are one syscall each, straight from/into the
+    caller's buffer. write_read() sends a frame and reads back in a single
+    I2C_RDWR ioctl (one kernel round trip, repeated start between them).
+    """
+
+    MAX_TRANSFER = 8192
+    COMBINED = True
+    READINTO = True
+
+    I2C_SLAVE = 0x0703
+    I2C_RDWR = 0x0707
+    I2C_M_RD = 0x0001
+
+    def __init__(self, bus=1, address=0x1F):
+        import ctypes
+        import fcntl
+
+        class Msg(ctypes.Structure):
+            _fields_ = [('addr', ctypes.c_uint16), ('flags', ctypes.c_uint16),
+                        ('len', ctypes.c_uint16), ('buf', ctypes.c_void_p)]
+
+        class Rdwr(ctypes.Structure):
+            _fields_ = [('msgs', ctypes.POINTER(Msg)), ('nmsgs', ctypes.c_uint32)]
+
+        self._ctypes = ctypes
+        self._ioctl = fcntl.ioctl
+        self.fd = os.open('/dev/i2c-%d' % bus, os.O_RDWR)
+        self._ioctl(self.fd, self.I2C_SLAVE, address)
+        self.address = address
+        # Message block for write_read, built once and patched per call
+        self._msgs = (Msg * 2)()
+        self._msgs[0].addr = self._msgs[1].addr = address
+        self._msgs[1].flags = self.I2C_M_RD
+        self._rdwr = Rdwr(self._msgs, 2)
+
+    def write(self, buf):
+        os.write(self.fd, buf)
+
+    def readinto(self, buf):
+        if os.readv(self.fd, [buf]) != len(buf):
+            raise OSError('short read')
+
+    def write_read(self, wbuf, rbuf):
+        ctypes = self._ctypes
+        if isinstance(wbuf, bytes):
+            wref = ctypes.c_char_p(wbuf)
+            waddr = ctypes.cast(wref, ctypes.c_void_p).value
+        else:
+            wref = ctypes.c_char.from_buffer(wbuf)
+            waddr = ctypes.addressof(wref)
+        rref = ctypes.c_char.from_buffer(rbuf)
+        msgs = self._msgs
+        msgs[0].len = len(wbuf)
+        msgs[0].buf = waddr
+        msgs[1].len = len(rbuf)
+        msgs[1].buf = ctypes.addressof(rref)
+        self._ioctl(self.fd, self.I2C_RDWR, self._rdwr)
+        del wref, rref
+
+    def close(self):
+        os.close(self.fd)
+
+
+class FakeTransport:
+    """In-memory transport for tests
+
+    handler(frame) returns the response bytes for each written frame; the
+    device then reads as BUSY for busy_reads transfers before answering,
+    and reads as BUSY again once the response is drained.
+    """
+
+    MAX_TRANSFER = None
+    COMBINED = True
+    READINTO = True
+
+    BUSY = 0xEE
+
+    def __init__(self, handler=None, busy_reads=0, address=0x1F):
+        self.handler = handler
+        self.busy_reads = busy_reads
+        self.address = address
+        self.written = []
+        self.reads = 0
+        self._out = b''
+        self._busy = 0
+
+    def write(self, buf):
+        frame = bytes(buf)
+        self.written.append(frame)
+        self._out = self.handler(frame) if self.handler else b''
+        self._busy = self.busy_reads
+
+    def readinto(self, buf):
+        self.reads += 1
+        n = len(buf)
+        if self._busy or not self._out:
+            self._busy = max(self._busy - 1, 0)
+            for i in range(n):
+                buf[i] = self.BUSY
+            return
+        chunk = self._out[:n]
+        buf[:len(chunk)] = chunk
+        for i in range(len(chunk), n):
+            buf[i] = self.BUSY
+        self._out = self._out[n:]
+
+    def write_read(self, wbuf, rbuf):
+        self.write(wbuf)
+        self.readinto(rbuf)
+
+    def close(self):
+        pass
+
+
+def open_transport(bus=1, address=0x1F):
+    """Open the fastest transport available on this host for an I2C bus"""
+    if os.path.exists('/dev/i2c-%d' % bus):
+        try:
+            return DevI2C(bus, address)
+        except (ImportError, OSError):
+            pass
+    return SMBus2I2C(bus, address)
@@ -35,8 +35,7 @@ def main():
                 
                 fp.ctrl_led(2, 3, 3)  # Yellow blink
                 print("Remove finger")
-                while fp.detect_finger():
-                    time.sleep(0.1)
+                fp.wait_finger(False, 10)
                 time.sleep(1)
 
             if fp.store_fingerprint(empty_id) == 0:
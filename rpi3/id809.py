@@ -1,17 +1,26 @@
 #!/usr/bin/env python3
 
-from smbus2 import SMBus
+import os
+import sys
 import time
-import struct
 
-class ID809:
+# The protocol core and transports live at the repository root. Run from
+# this directory, this file is "id809" as well: step aside while the core
+# loads under that name, then take it back. The core's timing helpers are
+# re-exported for its other modules (id809_steps, id809_retry) imported later.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+_front = sys.modules.pop(__name__) if __name__ == 'id809' else None
+try:
+    from id809 import ID809 as _ID809, sleep_ms, ticks_ms, ticks_diff
+finally:
+    if _front is not None:
+        sys.modules[__name__] = _front
+from id809_led import LedPlayer
+from id809_sched import CommandScheduler
+
+class ID809(_ID809):
     # Constants
     DEVICE_ADDR = 0x1F
-    CMD_PREFIX = 0xAA55
-    RCM_PREFIX = 0x55AA
-    CMD_TYPE = 0xF0
-    ERR_SUCCESS = 0x00
-    ERR_ID809 = 0xFF
 
     # LED Modes
     LED_BREATHING = 1
@@ -31,13 +40,15 @@ class ID809:
     LED_MAGENTA = 6
     LED_WHITE = 7
 
-    def __init__(self, bus_number=1):
-        self.bus = SMBus(bus_number)
-        self.fingerprint_capacity = 80
-        self._number = 0
-        self._state = 0
-        self._error = self.ERR_SUCCESS
-        self._buf = bytearray(32)
+    def __init__(self, bus_number=1, poll=True, presence=None):
+        super().__init__(bus_number, self.DEVICE_ADDR, poll, presence)
+
+    def is_connected(self):
+        """Test connection with sensor; False if it does not answer"""
+        try:
+            return super().is_connected()
+        except OSError:  # nothing on the bus at DEVICE_ADDR
+            return False
 
     def begin(self):
         return self.is_connected()
@@ -45,29 +56,25 @@ class ID809:
     def verify_fingerprint(self):
         """Verify fingerprint with proper detection"""
         print("\nPlace finger to verify")
-        self.ctrl_led(self.LED_BREATHING, self.LED_BLUE, 0)
+        self.ctrl_led(self.LED_BREATHING, self.LED_BLUE, 0, False)
         
-        if self.collection_fingerprint(10) == 0:
-            print("Scanning...")
-            match_id = self.search()
-            
-            if match_id > 0:  # Ensure we have a valid match ID
-                print(f"Match found! ID #{match_id}")
-                self.ctrl_led(self.LED_ON, self.LED_GREEN, 0)
-                return match_id
-            else:
-                print("No match found")
-                self.ctrl_led(self.LED_ON, self.LED_RED, 0)
-                return 0
+        match_id, timings = self.identify(10)
+        if match_id > 0:  # Ensure we have a valid match ID
+            print(f"Match found! ID #{match_id}")
+            self.ctrl_led(self.LED_ON, self.LED_GREEN, 0, False)
+        elif 'search' in timings:
+            print("No match found")
+            self.ctrl_led(self.LED_ON, self.LED_RED, 0, False)
         else:
             print("Scan failed!")
-            self.ctrl_led(self.LED_ON, self.LED_RED, 0)
-            return 0
+            self.ctrl_led(self.LED_ON, self.LED_RED, 0, False)
+        print("Timings (ms): %s" % timings)
+        return match_id
 
     def enroll_fingerprint(self, empty_id):
         """Full enrollment process with proper finger detection"""
         for i in range(3):
-            self.ctrl_led(self.LED_BREATHING, self.LED_BLUE, 0)
+            self.ctrl_led(self.LED_BREATHING, self.LED_BLUE, 0, False)
             print(f"\nPlace finger for scan #{i+1}")
             
             # Wait for finger placement and capture
@@ -75,12 +82,11 @@ class ID809:
                 print("Scan failed! Try again")
                 continue
             
-            self.ctrl_led(self.LED_FAST_BLINK, self.LED_YELLOW, 3)
+            self.ctrl_led(self.LED_FAST_BLINK, self.LED_YELLOW, 3, False)
             print("Remove finger")
             
             # Wait for finger removal
-            while self.detect_finger():
-                time.sleep(0.1)
+            self.wait_finger(False, 10)
             print("Finger removed")
             time.sleep(1)
         
@@ -89,170 +95,6 @@ class ID809:
             return True
         return False
 
-    def is_connected(self):
-        try:
-            header = self._pack(self.CMD_TYPE, 0x0001, None, 0)
-            self._send_packet(header)
-            time.sleep(0.05)
-            return self._response_payload() == self.ERR_SUCCESS
-        except:
-            return False
-
-    def detect_finger(self):
-        header = self._pack(self.CMD_TYPE, 0x0021, None, 0)
-        self._send_packet(header)
-        time.sleep(0.24)
-        ret = self._response_payload()
-        if ret == self.ERR_SUCCESS:
-            # Check if finger is actually present (0x00 = no finger, 0x01 = finger detected)
-            return self._buf[0] == 0x01
-        return False
-
-
-    def collection_fingerprint(self, timeout):
-        if self._number > 2:
-            self._error = "GATHER_OUT"
-            return self.ERR_ID809
-
-        print("Waiting for finger...")
-        start_time = time.time()
-        
-        # Wait for finger to be placed
-        while not self.detect_finger():
-            if (time.time() - start_time) > timeout:
-                print("Timeout waiting for finger!")
-                self._error = "TIMEOUT"
-                self._state = 0
-                return self.ERR_ID809
-            time.sleep(0.1)
-        
-        print("Finger detected!")
-        time.sleep(0.5)  # Small delay to ensure finger is stable
-        
-        ret = self._get_image()
-        if ret != self.ERR_SUCCESS:
-            print("Failed to capture image!")
-            self._state = 0
-            return self.ERR_ID809
-
-        ret = self._generate(self._number)
-        if ret != self.ERR_SUCCESS:
-            print("Failed to generate template!")
-            self._state = 0
-            return self.ERR_ID809
-
-        self._number += 1
-        self._state = 1
-        return ret
-
-
-
-    def store_fingerprint(self, fid):
-        ret = self._merge()
-        if ret != self.ERR_SUCCESS:
-            return self.ERR_ID809
-
-        self._number = 0
-        data = bytearray(4)
-        data[0] = fid
-
-        header = self._pack(self.CMD_TYPE, 0x0040, data, 4)
-        self._send_packet(header)
-        time.sleep(0.36)
-        return self._response_payload()
-
-    def search(self):
-        if self._state != 1:
-            return 0
-
-        data = bytearray(6)
-        data[2] = 1
-        data[4] = self.fingerprint_capacity
-        self._number = 0
-
-        header = self._pack(self.CMD_TYPE, 0x0063, data, 6)
-        self._send_packet(header)
-        time.sleep(0.36)
-
-        ret = self._response_payload()
-        return self._buf[0] if ret == self.ERR_SUCCESS else 0
-
-    def get_empty_id(self):
-        data = bytearray(4)
-        data[0] = 1
-        data[2] = self.fingerprint_capacity
-
-        header = self._pack(self.CMD_TYPE, 0x0045, data, 4)
-        self._send_packet(header)
-        time.sleep(0.1)
-
-        ret = self._response_payload()
-        return self._buf[0] if ret == self.ERR_SUCCESS else self.ERR_ID809
-
-    def ctrl_led(self, mode, color, blink_count):
-        data = bytearray(4)
-        data[0] = mode
-        data[1] = data[2] = color
-        data[3] = blink_count
-
-        header = self._pack(self.CMD_TYPE, 0x0024, data, 4)
-        self._send_packet(header)
-        time.sleep(0.05)
-        return self._response_payload()
-
-    def _send_packet(self, packet):
-        for i in range(0, len(packet), 32):
-            chunk = packet[i:i + 32]
-            self.bus.write_i2c_block_data(self.DEVICE_ADDR, 0, list(chunk))
-            time.sleep(0.001)
-
-    def _response_payload(self):
-        try:
-            self._buf = bytearray(self.bus.read_i2c_block_data(self.DEVICE_ADDR, 0, 32))
-            return self.ERR_SUCCESS if self._buf[0] == 0xee else self.ERR_ID809
-        except:
-            return self.ERR_ID809
-
-    def _pack(self, cmd_type, cmd, payload, length):
-        packet = bytearray(26)
-        struct.pack_into('>H', packet, 0, self.CMD_PREFIX)
-        packet[2:4] = b'\x00\x00'  # SID, DID
-        struct.pack_into('>H', packet, 4, cmd)
-        struct.pack_into('>H', packet, 6, length)
-
-        if payload:
-            packet[8:8+length] = payload
-
-        # Checksum
-        cks = 0xFF
-        for i in range(2, 8+length):
-            cks += packet[i]
-        struct.pack_into('>H', packet, 8+length, cks & 0xFFFF)
-
-        return packet
-
-    def _get_image(self):
-        header = self._pack(self.CMD_TYPE, 0x0020, None, 0)
-        self._send_packet(header)
-        time.sleep(0.36)
-        return self._response_payload()
-
-    def _generate(self, ram_id):
-        data = bytearray(2)
-        data[0] = ram_id
-        header = self._pack(self.CMD_TYPE, 0x0060, data, 2)
-        self._send_packet(header)
-        time.sleep(0.36)
-        return self._response_payload()
-
-    def _merge(self):
-        data = bytearray(3)
-        data[2] = self._number
-        header = self._pack(self.CMD_TYPE, 0x0061, data, 3)
-        self._send_packet(header)
-        time.sleep(0.36)
-        return self._response_payload()
-
 
 def main():
     print("Initializing fingerprint sensor...")
@@ -263,6 +105,10 @@ def main():
         return
 
     print("Sensor initialized successfully!")
+
+    # The menu and the LED player share the sensor through one queue
+    sched = CommandScheduler(fp)
+    leds = LedPlayer(sched)
     
     while True:
         print("\nFingerprint Sensor Menu:")
@@ -274,7 +120,7 @@ def main():
         choice = input("\nSelect option (1-4): ")
 
         if choice == '1':
-            empty_id = fp.get_empty_id()
+            empty_id = sched.get_empty_id().wait()
             if empty_id == fp.ERR_ID809:
                 print("No empty slots available!")
                 continue
@@ -282,39 +128,30 @@ def main():
             print(f"\nStarting enrollment for ID #{empty_id}")
             print("You'll need to scan your finger 3 times")
             
-            if fp.enroll_fingerprint(empty_id):
+            if sched.enroll_fingerprint(empty_id).wait():
                 print(f"Success! Fingerprint stored as ID #{empty_id}")
-                fp.ctrl_led(fp.LED_ON, fp.LED_GREEN, 0)
+                leds.play(LedPlayer.SUCCESS)
             else:
                 print("Failed to store fingerprint!")
-                fp.ctrl_led(fp.LED_ON, fp.LED_RED, 0)
-            
-            time.sleep(2)
-            fp.ctrl_led(fp.LED_OFF, fp.LED_BLUE, 0)
+                leds.play(LedPlayer.FAILURE)
 
         elif choice == '2':
-            match_id = fp.verify_fingerprint()
+            match_id = sched.verify_fingerprint().wait()
             if match_id > 0:
                 print(f"Match found! ID #{match_id}")
-            time.sleep(2)
-            fp.ctrl_led(fp.LED_OFF, fp.LED_BLUE, 0)
+            leds.play(((None, 0, 0, 2.0),) + LedPlayer.OFF)
 
         elif choice == '3':
-            print("\nTesting LED patterns...")
+            print("\nTesting LED patterns in the background...")
             modes = [fp.LED_BREATHING, fp.LED_FAST_BLINK, fp.LED_ON, fp.LED_FADE_IN]
             colors = [fp.LED_BLUE, fp.LED_GREEN, fp.LED_RED, fp.LED_YELLOW]
-            
-            for mode in modes:
-                for color in colors:
-                    print(f"Testing mode {mode} with color {color}")
-                    fp.ctrl_led(mode, color, 3)
-                    time.sleep(2)
-            
-            fp.ctrl_led(fp.LED_OFF, fp.LED_BLUE, 0)
-            print("LED test complete")
+            leds.play([(mode, color, 3, 2.0) for mode in modes for color in colors]
+                      + list(LedPlayer.OFF))
 
         elif choice == '4':
             print("\nExiting...")
+            leds.close()
+            sched.close()
             break
 
         else:
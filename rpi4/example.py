@@ -19,7 +19,6 @@ class FingerprintExample:
     def __init__(self):
         """Initialize the fingerprint sensor"""
         self.fp = DFRobot_ID809()
-        self.next_id = 1  # Track the next available ID
         
     def initialize(self):
         """Initialize the sensor and verify connection"""
@@ -59,17 +58,21 @@ class FingerprintExample:
                     continue
                     
                 print("Please lift your finger")
-                while self.fp.detect_finger():
-                    time.sleep(0.1)
+                self.fp.wait_finger(False, 10)
                 
                 time.sleep(1)
             
-            # Store the fingerprint
+            # Store the fingerprint in the first free slot, from the
+            # driver's slot index rather than a counter of our own
             print("\nProcessing and storing fingerprint...")
-            if self.fp.store_fingerprint(self.next_id) == 0:
-                print(f"Fingerprint stored successfully with ID: {self.next_id}")
+            fid = self.fp.get_empty_id()
+            if fid == self.fp.ERR_ID809:
+                print("No free slot left!")
+                self.fp.ctrl_led(self.fp.LEDMode.KEEPS_ON, self.fp.LEDColor.RED, 0)
+                time.sleep(2)
+            elif self.fp.store_fingerprint(fid) == 0:
+                print(f"Fingerprint stored successfully with ID: {fid}")
                 self.fp.ctrl_led(self.fp.LEDMode.KEEPS_ON, self.fp.LEDColor.GREEN, 0)
-                self.next_id += 1
                 time.sleep(2)
             else:
                 print("Failed to store fingerprint!")
@@ -104,8 +107,7 @@ class FingerprintExample:
                 self.fp.ctrl_led(self.fp.LEDMode.KEEPS_ON, self.fp.LEDColor.RED, 0)
                 
             print("\nPlease lift your finger")
-            while self.fp.detect_finger():
-                time.sleep(0.1)
+            self.fp.wait_finger(False, 10)
                 
             time.sleep(2)
             
@@ -123,7 +125,6 @@ class FingerprintExample:
             if id_to_delete.lower() == 'all':
                 if self.fp.del_fingerprint(0xFF) == 0:  # 0xFF is DELALL
                     print("All fingerprints deleted successfully!")
-                    self.next_id = 1
                 else:
                     print("Failed to delete fingerprints!")
             else:
@@ -131,8 +132,6 @@ class FingerprintExample:
                     id_num = int(id_to_delete)
                     if self.fp.del_fingerprint(id_num) == 0:
                         print(f"Fingerprint ID {id_num} deleted successfully!")
-                        if id_num == self.next_id - 1:
-                            self.next_id = id_num
                     else:
                         print(f"Failed to delete fingerprint ID {id_num}!")
                 except ValueError:
@@ -1,10 +1,15 @@
 #!/usr/bin/env python3
 
-import smbus2 as smbus
-import time
+import os
+import sys
 from enum import Enum
 import logging
 
+# The protocol core and transports live at the repository root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from id809 import ID809 as _ID809
+
 # Set up logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
@@ -53,124 +58,25 @@ class ID809:
     def __init__(self, bus_number=1, address=0x1F):
         """Initialize the ID809 fingerprint sensor."""
         try:
-            self.bus = smbus.SMBus(bus_number)
+            # Frames go out as single block transfers through the shared
+            # protocol core, which polls the busy byte instead of sleeping
+            self._fp = _ID809(bus_number, address)
+            self.bus = self._fp.bus
             self.address = address
-            self._fingerprint_capacity = 80
             logger.info(f"Initialized ID809 on bus {bus_number} at address 0x{address:02X}")
-            
-            # Initial device reset sequence
-            self._reset_device()
-            
         except Exception as e:
-            logger.error(f"Failed to initialize SMBus: {str(e)}")
+            logger.error(f"Failed to initialize I2C bus: {str(e)}")
             raise
 
-    def _reset_device(self):
-        """Reset the device communication state."""
-        try:
-            # Read a byte to check device state
-            self.bus.read_byte(self.address)
-            time.sleep(0.1)
-        except:
-            pass
-        
-        # Wait for device to be ready
-        time.sleep(0.5)
-
-    def _wait_for_ready(self):
-        """Wait for the device to be ready (not returning 0xEE)."""
-        max_retries = 10
-        for _ in range(max_retries):
-            try:
-                value = self.bus.read_byte(self.address)
-                if value != 0xEE:
-                    return True
-                time.sleep(0.1)
-            except:
-                time.sleep(0.1)
-        return False
-
-    def _send_packet(self, cmd_type, cmd, payload=None):
-        """Send a command packet to the sensor."""
-        try:
-            if payload is None:
-                payload = []
-                
-            # Wait for device to be ready
-            if not self._wait_for_ready():
-                logger.error("Device not ready")
-                return False
-                
-            # Construct packet header
-            packet = []
-            # Prefix (AA 55)
-            packet.extend([0xAA, 0x55])
-            # SID and DID
-            packet.extend([0x00, 0x00])
-            # Command
-            packet.extend([cmd >> 8, cmd & 0xFF])
-            # Length
-            packet.extend([len(payload) >> 8, len(payload) & 0xFF])
-            
-            # Add payload
-            packet.extend(payload)
-            
-            # Calculate checksum
-            cks = 0xFF
-            for b in packet[2:]:  # Skip prefix bytes
-                cks += b
-            packet.extend([cks & 0xFF, (cks >> 8) & 0xFF])
-            
-            logger.debug(f"Sending packet: {[hex(x) for x in packet]}")
-            
-            # Send the command byte by byte
-            for byte in packet:
-                self.bus.write_byte(self.address, byte)
-                time.sleep(0.001)  # Small delay between bytes
-                
-            return True
-            
-        except Exception as e:
-            logger.error(f"Error sending packet: {str(e)}")
-            return False
-
-    def _read_response(self, expected_length):
-        """Read response from the sensor."""
-        try:
-            # Initial delay before reading
-            time.sleep(0.1)
-            
-            # Wait for ready state
-            if not self._wait_for_ready():
-                return None
-            
-            response = []
-            for _ in range(expected_length):
-                try:
-                    byte = self.bus.read_byte(self.address)
-                    response.append(byte)
-                    time.sleep(0.001)  # Small delay between bytes
-                except IOError:
-                    break
-                    
-            logger.debug(f"Read response: {[hex(x) for x in response]}")
-            return response
-            
-        except Exception as e:
-            logger.error(f"Error reading response: {str(e)}")
-            return None
+    @property
+    def _fingerprint_capacity(self):
+        return self._fp.fingerprint_capacity
 
     def is_connected(self):
         """Test if the sensor is properly connected."""
         try:
             logger.debug("Testing connection...")
-            if self._send_packet(self.CMD_PREFIX_CODE, self.CMD_TEST_CONNECTION):
-                response = self._read_response(12)
-                if response is not None and len(response) >= 12:
-                    # Check for valid response prefix (55 AA)
-                    if response[0] == 0x55 and response[1] == 0xAA:
-                        return True
-            return False
+            return self._fp.is_connected()
         except Exception as e:
             logger.error(f"Connection test failed: {str(e)}")
             return False
@@ -183,48 +89,10 @@ class ID809:
                 mode = mode.value
             if isinstance(color, LEDColor):
                 color = color.value
-                
-            # Adjust payload based on different module versions
-            if self._fingerprint_capacity == 80:
-                payload = [mode, color, color, blink_count]
-            else:
-                # Handle different LED control format for other versions
-                if mode == 1:  # BREATHING
-                    mode = 2
-                elif mode == 2:  # FAST_BLINK
-                    mode = 4
-                elif mode == 3:  # KEEPS_ON
-                    mode = 1
-                elif mode == 4:  # NORMAL_CLOSE
-                    mode = 0
-                elif mode == 5:  # FADE_IN
-                    mode = 3
-                    
-                if color == LEDColor.GREEN.value:
-                    color_value = 0x84
-                elif color == LEDColor.RED.value:
-                    color_value = 0x82
-                elif color == LEDColor.YELLOW.value:
-                    color_value = 0x86
-                elif color == LEDColor.BLUE.value:
-                    color_value = 0x81
-                elif color == LEDColor.CYAN.value:
-                    color_value = 0x85
-                elif color == LEDColor.MAGENTA.value:
-                    color_value = 0x83
-                else:
-                    color_value = 0x87
-                    
-                payload = [mode, color_value, color_value, blink_count]
-                
-            if self._send_packet(self.CMD_PREFIX_CODE, self.CMD_SLED_CTRL, payload):
-                response = self._read_response(12)
-                if response and len(response) >= 12:
-                    # Check response prefix and status
-                    if response[0] == 0x55 and response[1] == 0xAA:
-                        return response[8] == 0
-            return False
-            
+
+            # The core maps modes and colors for the 200-slot module variant
+            return self._fp.ctrl_led(mode, color, blink_count) == _ID809.ERR_SUCCESS
+
         except Exception as e:
             logger.error(f"LED control failed: {str(e)}")
             return False
@@ -233,13 +101,9 @@ class ID809:
         """Detect if a finger is present on the sensor."""
         try:
             logger.debug("Detecting finger...")
-            if self._send_packet(self.CMD_PREFIX_CODE, self.CMD_FINGER_DETECT):
-                response = self._read_response(12)
-                if response and len(response) >= 12:
-                    result = response[8] == 0
-                    logger.debug(f"Finger detection result: {result}")
-                    return result
-            return False
+            result = bool(self._fp.detect_finger())
+            logger.debug(f"Finger detection result: {result}")
+            return result
         except Exception as e:
             logger.error(f"Finger detection failed: {str(e)}")
             return False
@@ -0,0 +1,62 @@
+"""Guarded behind a CommandScheduler, against the simulator"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from id809 import ID809, Deadline
+from id809_retry import CircuitBreaker, CircuitOpen, Guarded, RetryPolicy
+from id809_sched import CommandScheduler
+from id809_sim import ID809Sim
+
+
+@pytest.fixture
+def guarded():
+    sim = ID809Sim(scale=0)
+    fp = ID809(sim)
+    assert fp.begin()
+    guard = Guarded(fp, RetryPolicy(attempts=2, base_ms=1),
+                    CircuitBreaker(threshold=3, probe_s=60))
+    yield sim, guard
+    guard.close()
+
+
+def test_breaker_opens_behind_scheduler(guarded):
+    sim, guard = guarded
+    sched = CommandScheduler(guard)
+    sim.fail_next = 10 ** 6
+    errors = []
+    for _ in range(10):
+        with pytest.raises(OSError) as e:
+            sched.get_device_info().wait(5)
+        errors.append(e.type)
+    sched.close()
+    assert guard.breaker.state == CircuitBreaker.OPEN
+    assert guard.breaker.failures >= 3
+    assert errors[:3] == [OSError] * 3
+    assert errors[-1] is CircuitOpen
+    assert guard.breaker.rejected == 7
+
+
+def test_idle_flush_records_nothing(guarded):
+    sim, guard = guarded
+    guard.breaker.failures = 2
+    assert guard.flush() == guard.fp.ERR_SUCCESS
+    assert guard.breaker.failures == 2
+
+
+def test_host_helpers_pass_through_while_open(guarded):
+    sim, guard = guarded
+    guard.breaker.state = CircuitBreaker.OPEN
+    guard.breaker.opened_at = guard.breaker.opened_at or 1
+    guard._prober = True  # a probe thread owns recovery
+    with guard.within(Deadline(100)):
+        pass
+    guard.set_group('door', [5, 15])
+    assert guard.search_ranges('door') == [(5, 5), (15, 15)]
+    assert guard.hot_slots() == []
+    with pytest.raises(CircuitOpen):
+        guard.is_connected()
+    guard._prober = None
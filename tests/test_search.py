@@ -0,0 +1,36 @@
+"""Search planning over groups, against the simulator"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from id809 import ID809
+from id809_sim import ID809Sim
+
+
+def test_group_search_never_spans_unselected_slots():
+    sim = ID809Sim(scale=0)
+    sim.enroll(5, 'alice')
+    sim.enroll(15, 'bob')
+    fp = ID809(sim)
+    assert fp.begin()
+    assert fp.load_slots()
+    fp.set_group('door', [5, 15])
+    sim.enroll(10, 'mallory')  # not in the index: another host enrolled it
+    assert fp.search_ranges('door') == [(5, 5), (15, 15)]
+    sim.place('mallory')
+    assert fp.identify(1, slots='door')[0] == 0
+    sim.place('bob')
+    assert fp.identify(1, slots='door')[0] == 15
+
+
+def test_empty_ends_trimmed_within_selection():
+    sim = ID809Sim(scale=0)
+    sim.enroll(22, 'alice')
+    sim.enroll(30, 'bob')
+    fp = ID809(sim)
+    assert fp.begin()
+    assert fp.load_slots()
+    fp.set_group('lab-staff', (20, 45))
+    assert fp.search_ranges('lab-staff') == [(22, 30)]
+    assert fp.search_ranges() == [(1, fp.fingerprint_capacity)]
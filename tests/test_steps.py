@@ -0,0 +1,55 @@
+"""Step-driven jobs against the simulator"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from id809 import ID809
+from id809_sim import ID809Sim
+from id809_steps import VerifyJob
+
+
+def test_cancel_during_drain_keeps_deferred_reply():
+    sim = ID809Sim(scale=0.2)
+    fp = ID809(sim)
+    assert fp.begin()
+    fp.ctrl_led(3, 1, 0, wait=False)
+    job = VerifyJob(fp)
+    job.step()
+    job.cancel()
+    assert fp._deferred == 0x0024
+    assert fp.is_connected()
+    assert fp._deferred == 0 and fp.deferred_error is None
+
+
+class CountingSim(ID809Sim):
+    """Counts bus transfers"""
+
+    transfers = 0
+
+    def write(self, buf):
+        self.transfers += 1
+        return super().write(buf)
+
+    def readinto(self, buf):
+        self.transfers += 1
+        return super().readinto(buf)
+
+    def write_read(self, wbuf, rbuf):
+        super().write_read(wbuf, rbuf)
+        self.transfers -= 1  # one combined transaction, counted twice above
+
+
+def test_one_transfer_per_step():
+    for poll in (True, False):
+        sim = CountingSim(scale=0)
+        sim.enroll(3, 'alice')
+        sim.place('alice')
+        fp = ID809(sim, poll=poll)
+        assert fp.begin()
+        job = VerifyJob(fp)
+        while not job.done:
+            before = sim.transfers
+            job.step()
+            assert sim.transfers - before <= 1, poll
+        assert job.result == 3